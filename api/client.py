@@ -1,212 +1,604 @@
 import aiohttp
+import asyncio
+import functools
+import hashlib
 import json
+import os
 import re
+import time
+from urllib.parse import urlsplit
+from api.frpc import iter_frpc_stream
+from api.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, UpstreamError, UpstreamThrottledError,
+    RETRYABLE_ERRORS, RETRYABLE_STATUS, upstream_rejected, upstream_retries, upstream_throttled
+)
+from api.uptime import ServiceStatusParser
+from utils.cache import TTLCache
+from utils.portrange import PortRangeSet
+from utils.logger import logger, LazyJSON
+from utils.metrics import upstream_requests, upstream_duration, upstream_bytes, upstream_cache
+from utils.ratelimit import upstream_limiter
+
+class SingleFlight:
+    """合併相同 key 的並發調用：同時進行的請求共享同一個 in-flight 任務"""
+    
+    def __init__(self):
+        self._inflight = {}
+    
+    async def do(self, key, factory):
+        """若 key 已有進行中的任務則等待它，否則用 factory() 創建"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        
+        # shield：單個調用者超時被取消時，不影響其他仍在等待的調用者
+        return await asyncio.shield(task)
+    
+    def _forget(self, key, task):
+        """任務完成後移除，並取走異常避免 "never retrieved" 警告"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()
+    
+    def __len__(self):
+        return len(self._inflight)
+
+class CachedResponse:
+    """快取的上游響應，附帶用於條件請求的 ETag / Last-Modified"""
+    __slots__ = ("value", "fetched_at", "etag", "last_modified")
+    
+    def __init__(self, value, headers=None):
+        self.value = value
+        self.fetched_at = time.monotonic()
+        self.etag = headers.get("ETag") if headers else None
+        self.last_modified = headers.get("Last-Modified") if headers else None
+    
+    def revalidated(self) -> "CachedResponse":
+        """上游返回 304 時沿用舊值，只刷新時間戳"""
+        self.fetched_at = time.monotonic()
+        return self
+    
+    def conditional_headers(self) -> dict:
+        """構造 If-None-Match / If-Modified-Since 請求頭"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class TunnelInventory:
+    """一個帳號的隧道清單：按名稱索引，並帶內容哈希用於判斷清單是否變化"""
+    __slots__ = ("tunnels", "by_name", "content_hash", "fetched_at")
+    
+    def __init__(self, tunnels: list, content_hash: str = None):
+        self.tunnels = tunnels
+        self.by_name = {tunnel.get("name"): tunnel for tunnel in tunnels if tunnel.get("name")}
+        self.content_hash = content_hash or self.hash(tunnels)
+        self.fetched_at = time.monotonic()
+    
+    @staticmethod
+    def hash(tunnels: list) -> str:
+        """清單內容的穩定哈希（與字段順序無關）"""
+        payload = json.dumps(tunnels, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+    
+    def get(self, name: str) -> dict:
+        return self.by_name.get(name)
+    
+    def __len__(self):
+        return len(self.tunnels)
+
+class CredentialsRejectedError(Exception):
+    """上游以 4xx 拒絕了帳號密碼（例如密碼已在 TaiwanFRP 修改），需要重新綁定"""
+    
+    def __init__(self, username: str, status: int):
+        super().__init__(f"帳號 {username} 的認證被拒絕（HTTP {status}）")
+        self.username = username
+        self.status = status
+
+def single_flight(func):
+    """以「方法名 + 參數」為 key，合併對同一端點的並發相同請求"""
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        return await self._single_flight.do(key, lambda: func(self, *args, **kwargs))
+    return wrapper
 
 class TaiwanFRPClient:
-    def __init__(self, base_url="https://taiwanfrp.ddns.net"):
+    def __init__(self, base_url="https://taiwanfrp.ddns.net",
+                 limit=None, limit_per_host=None, keepalive_timeout=None,
+                 dns_cache_ttl=None, total_timeout=None, connect_timeout=None):
         self.base_url = base_url
         self.session = None
+        self._single_flight = SingleFlight()
+        
+        # 每個上游端點一個熔斷器；冪等請求按 retry_policy 重試
+        self.retry_policy = RetryPolicy()
+        self.breakers = {}
+        
+        # Uptime Kuma 狀態頁（uptime.taiwanfrp.me/status/service）
+        self.uptime_url = os.getenv("FRP_UPTIME_URL", "https://uptime.taiwanfrp.me")
+        self.uptime_slug = os.getenv("FRP_UPTIME_SLUG", "service")
+        self.status_parser = ServiceStatusParser()
+        
+        # 公共端點的響應快取：TTL 內直接返回；過期但未超過 max_stale 時先返回舊值並在背景刷新
+        # （監控數據和狀態頁由監控輪詢每次直接請求，只保存驗證頭用於條件請求）
+        self.cache_ttls = {
+            "nodes": float(os.getenv("FRP_CACHE_TTL_NODES", "60"))
+        }
+        self.cache_max_stale = float(os.getenv("FRP_CACHE_MAX_STALE", "600"))
+        self._response_cache = {}
+        self._refreshing = {}
+        
+        # 每個帳號的隧道清單：TTL 內直接返回；條目保留更久，用於判斷刷新後內容是否變化
+        self.inventory_ttl = float(os.getenv("FRP_INVENTORY_TTL", "30"))
+        self._inventories = TTLCache(
+            maxsize=int(os.getenv("FRP_INVENTORY_MAX_USERS", "1024")),
+            ttl=self.inventory_ttl + self.cache_max_stale,
+            name="inventory"
+        )
+        
+        # 連接池配置（未指定時讀取環境變量）
+        self.limit = limit or int(os.getenv("FRP_HTTP_LIMIT", "100"))
+        self.limit_per_host = limit_per_host or int(os.getenv("FRP_HTTP_LIMIT_PER_HOST", "20"))
+        self.keepalive_timeout = keepalive_timeout or float(os.getenv("FRP_HTTP_KEEPALIVE", "30"))
+        self.dns_cache_ttl = dns_cache_ttl or int(os.getenv("FRP_HTTP_DNS_TTL", "300"))
+        
+        # 默認超時：略小於命令層的 asyncio.wait_for(10s)，讓連接錯誤先在這裡浮現
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout or float(os.getenv("FRP_HTTP_TIMEOUT", "9")),
+            connect=connect_timeout or float(os.getenv("FRP_HTTP_CONNECT_TIMEOUT", "5"))
+        )
+    
+    def _create_session(self) -> aiohttp.ClientSession:
+        """創建帶連接池、keep-alive 和 DNS 快取的 session"""
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+    
+    async def start(self):
+        """在機器人啟動時預先建立共享 session"""
+        await self._get_session()
     
     async def _get_session(self):
         """獲取或創建 aiohttp session"""
         if self.session is None or self.session.closed:
-            self.session = aiohttp.ClientSession()
+            self.session = self._create_session()
         return self.session
     
     async def close(self):
-        """關閉 session"""
-        if self.session:
+        """關閉 session（連同連接池）"""
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        if self.session and not self.session.closed:
             await self.session.close()
+        self.session = None
     
-    async def login(self, username: str, password: str) -> bool:
-        """登入驗證"""
+    async def _cached(self, name: str, fetch, force: bool = False):
+        """按 stale-while-revalidate 策略讀取快取的公共端點
+        
+        沒有可用的快取且上游不可用時拋出 UpstreamError，不會返回空數據冒充「沒有節點」。
+        force=True 時跳過快取直接請求上游（仍帶條件請求頭），失敗時也不返回舊值。
+        """
+        if force:
+            return await self._refresh(name, fetch, allow_stale=False)
+        
+        entry = self._response_cache.get(name)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.cache_ttls[name]:
+                self._record_cache(name, "hits")
+                return entry.value
+            if age < self.cache_ttls[name] + self.cache_max_stale:
+                self._record_cache(name, "stale")
+                self._schedule_refresh(name, fetch)
+                return entry.value
+        
+        self._record_cache(name, "misses")
+        return await self._refresh(name, fetch)
+    
+    def _record_cache(self, name: str, result: str):
+        """統計快取查詢結果；直接由快取返回的調用也寫入事件日誌"""
+        upstream_cache.inc(endpoint=name, result=result)
+        if result != "misses":
+            logger.log_event("api", method="GET", endpoint=name, success=True, cache_hit=True)
+    
+    def _schedule_refresh(self, name: str, fetch):
+        """在背景刷新快取（同一端點同時只有一個刷新任務）"""
+        if name in self._refreshing:
+            return
+        task = asyncio.ensure_future(self._refresh(name, fetch))
+        self._refreshing[name] = task
+        task.add_done_callback(functools.partial(self._refresh_done, name))
+    
+    def _refresh_done(self, name: str, task):
+        """背景刷新結束；失敗已由 _request 記錄，這裡只取走異常"""
+        self._refreshing.pop(name, None)
+        if not task.cancelled():
+            task.exception()
+    
+    async def _refresh(self, name: str, fetch, allow_stale: bool = True):
+        """請求上游並更新快取；失敗時返回仍在 max_stale 內的舊值（allow_stale=False 時直接拋出）"""
         try:
-            session = await self._get_session()
-            url = f"{self.base_url}/login"
-            async with session.post(
-                url,
-                json={"username": username, "password": password}
-            ) as resp:
-                # 根據 HTTP 狀態碼判斷 - 200 表示成功，其他表示失敗
-                if resp.status == 200:
-                    return True
-                else:
-                    text = await resp.text()
-                    print(f"❌ 登入失敗: HTTP {resp.status} - {text[:200]}")
-                    return False
-        except Exception as e:
-            print(f"❌ 登入失敗: {e}")
+            return await self._single_flight.do(
+                ("refresh", name),
+                lambda: self._do_refresh(name, fetch)
+            )
+        except Exception:
+            cached = self._response_cache.get(name)
+            if not allow_stale or cached is None or \
+                    time.monotonic() - cached.fetched_at >= self.cache_ttls[name] + self.cache_max_stale:
+                raise
+            return cached.value
+    
+    async def _do_refresh(self, name: str, fetch):
+        cached = self._response_cache.get(name)
+        entry = await fetch(cached)
+        if entry is cached:
+            upstream_cache.inc(endpoint=name, result="not_modified")
+        self._response_cache[name] = entry
+        return entry.value
+    
+    def cache_ratio(self, name: str) -> float:
+        """指定端點直接由快取返回（含過期後背景刷新）的比例"""
+        served = sum(upstream_cache.value(endpoint=name, result=r) for r in ("hits", "stale"))
+        total = served + upstream_cache.value(endpoint=name, result="misses")
+        return served / total if total else 0.0
+    
+    def _breaker(self, url: str, endpoint: str, scope: str = None) -> CircuitBreaker:
+        """按 (主機, 端點, scope) 取得熔斷器；scope 用於按節點區分同一端點"""
+        key = (urlsplit(url).hostname, endpoint, scope)
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            name = "/".join(part for part in key if part)
+            breaker = self.breakers[key] = CircuitBreaker(name)
+        return breaker
+    
+    async def _acquire_upstream(self, endpoint: str, deadline: float):
+        """從全局上游預算中扣除一次請求；令牌不足時等待，deadline 前等不到則拋出 UpstreamThrottledError"""
+        while True:
+            wait = upstream_limiter.retry_after(None)
+            if wait <= 0:
+                upstream_limiter.consume(None)
+                return
+            if time.monotonic() + wait >= deadline:
+                upstream_throttled.inc(endpoint=endpoint)
+                raise UpstreamThrottledError(endpoint, wait)
+            await asyncio.sleep(wait)
+    
+    async def _request(self, endpoint: str, method: str, url: str, handler, retry: bool = None,
+                       breaker_scope: str = None, **kwargs):
+        """發送請求並用 handler(resp) 處理 2xx–4xx 響應
+        
+        連接錯誤、超時、5xx 和 429 拋出 UpstreamError；冪等請求（默認為 GET，只讀的 POST
+        可傳 retry=True）在總超時內退避重試。端點（按 breaker_scope 細分，如節點名）熔斷時
+        不發出請求，直接拋出 CircuitOpenError。
+        每次實際發出的請求（含重試）都從全局上游預算（RATE_LIMIT_UPSTREAM）中扣除。
+        """
+        breaker = self._breaker(url, endpoint, breaker_scope)
+        if not breaker.allow():
+            upstream_rejected.inc(breaker=breaker.name)
+            raise CircuitOpenError(endpoint, breaker.name, breaker.retry_after())
+        
+        attempts = self.retry_policy.attempts if (method == "GET" if retry is None else retry) else 1
+        deadline = time.monotonic() + self.timeout.total
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                # 最多等到總超時過半，保證請求本身仍有足夠時間
+                await self._acquire_upstream(endpoint, deadline - self.timeout.total / 2)
+            except BaseException:
+                # 請求未發出：不計入熔斷統計
+                breaker.release()
+                raise
+            timeout = aiohttp.ClientTimeout(total=deadline - time.monotonic(), connect=self.timeout.connect)
+            try:
+                result = await self._attempt(endpoint, method, url, handler, timeout=timeout, **kwargs)
+            except (UpstreamError, *RETRYABLE_ERRORS) as e:
+                status = getattr(e, "status", None)
+                if status is not None and status < 500 and status not in RETRYABLE_STATUS:
+                    # handler 拒絕的 4xx：主機正常響應，不計入熔斷
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                retryable = status is None or status in RETRYABLE_STATUS
+                delay = self.retry_policy.delay(attempt)
+                if not retryable or attempt >= attempts or time.monotonic() + delay >= deadline \
+                        or not breaker.allow():
+                    if isinstance(e, UpstreamError):
+                        raise
+                    raise UpstreamError(endpoint, str(e) or type(e).__name__) from e
+                upstream_retries.inc(endpoint=endpoint)
+                await asyncio.sleep(delay)
+            except BaseException:
+                # 取消或響應處理出錯：不計入熔斷統計
+                breaker.release()
+                raise
+            else:
+                breaker.record_success()
+                return result
+    
+    async def _attempt(self, endpoint: str, method: str, url: str, handler, **kwargs):
+        """單次請求，同時記錄耗時、狀態碼、接收字節數和異常"""
+        session = await self._get_session()
+        started = time.perf_counter()
+        status = None
+        size = None
+        error = None
+        try:
+            async with session.request(method, url, **kwargs) as resp:
+                status = resp.status
+                if status >= 500 or status in RETRYABLE_STATUS:
+                    raise UpstreamError(endpoint, f"HTTP {status}", status)
+                result = await handler(resp)
+                size = resp.content.total_bytes
+                return result
+        except UpstreamError:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self._record_request(endpoint, method, status, time.perf_counter() - started, size, error)
+    
+    def _record_request(self, endpoint: str, method: str, status: int, duration: float,
+                        size: int, error: BaseException):
+        """把一次上游調用寫入指標和日誌"""
+        if error is not None:
+            outcome = type(error).__name__
+            error_msg = str(error) or outcome
+        else:
+            outcome = str(status)
+            # 5xx 視為上游故障寫入錯誤日誌；4xx 多為帳號或參數問題，只記入 API 日誌
+            error_msg = f"HTTP {status}" if status >= 500 else None
+        
+        upstream_requests.inc(endpoint=endpoint, status=outcome)
+        upstream_duration.observe(duration, endpoint=endpoint)
+        if size:
+            upstream_bytes.inc(size, endpoint=endpoint)
+        
+        logger.log_api_call(
+            method, endpoint,
+            success=error is None and status < 400,
+            response_time=duration,
+            error=error_msg,
+            status=status,
+            cache_hit=False,
+            size=size
+        )
+    
+    async def login(self, username: str, password: str) -> bool:
+        """登入驗證；帳號或密碼錯誤返回 False，上游不可用時拋出 UpstreamError"""
+        async def handle(resp):
+            # 根據 HTTP 狀態碼判斷 - 200 表示成功，其他表示失敗
+            if resp.status == 200:
+                return True
+            text = await resp.text()
+            logger.api_logger.warning(f"❌ 登入失敗: HTTP {resp.status} - {text[:200]}")
             return False
+        
+        return await self._request(
+            "login", "POST", f"{self.base_url}/login", handle,
+            json={"username": username, "password": password}
+        )
     
+    @single_flight
     async def list_tunnels(self, username: str, password: str) -> list:
-        """獲取代理列表"""
+        """獲取代理列表；請求失敗時拋出 UpstreamError，不會返回空列表冒充「沒有隧道」"""
+        async def handle(resp):
+            if resp.status != 200:
+                raise UpstreamError("list_tunnels", f"HTTP {resp.status}", resp.status)
+            
+            data = await resp.json()
+            logger.log_payload("list_tunnels", data)
+            
+            # 嘗試多種可能的字段名稱
+            tunnels = data.get("tunnels", []) or data.get("data", []) or []
+            
+            # LOG_LEVEL=DEBUG 時才會序列化
+            logger.api_logger.debug("📋 獲取到 %d 個隧道: %s", len(tunnels), LazyJSON(tunnels))
+            return tunnels
+        
+        return await self._request(
+            "list_tunnels", "POST", f"{self.base_url}/list_tunnels", handle, retry=True,
+            json={"username": username, "password": password}
+        )
+    
+    @staticmethod
+    def _password_digest(password: str) -> bytes:
+        return hashlib.sha256(password.encode("utf-8")).digest()
+    
+    async def get_inventory(self, username: str, password: str, force: bool = False) -> TunnelInventory:
+        """獲取帳號的隧道清單（帶短 TTL 快取）；內容未變時沿用原對象，不重建索引
+        
+        上游暫時不可用時返回保留期內的舊清單；帳號密碼被拒絕時拋出 CredentialsRejectedError。
+        """
+        digest = self._password_digest(password)
+        entry = self._inventories.get(username)
+        # 密碼不一致的快取條目不可使用（避免未通過驗證就讀到他人的清單）
+        previous = entry[1] if entry is not None and entry[0] == digest else None
+        
+        if previous is not None and not force and time.monotonic() - previous.fetched_at < self.inventory_ttl:
+            upstream_cache.inc(endpoint="inventory", result="hits")
+            return previous
+        
         try:
-            session = await self._get_session()
-            url = f"{self.base_url}/list_tunnels"
-            async with session.post(
-                url,
-                json={"username": username, "password": password}
-            ) as resp:
-                if resp.status != 200:
-                    print(f"❌ 獲取代理列表失敗: HTTP {resp.status}")
-                    return []
-                
-                data = await resp.json()
-                print(f"📋 API 返回的隧道數據: {json.dumps(data, ensure_ascii=False, indent=2)}")
-                
-                # 嘗試多種可能的字段名稱
-                tunnels = data.get("tunnels", []) or data.get("data", []) or []
-                
-                if tunnels:
-                    print(f"✅ 成功獲取 {len(tunnels)} 個隧道")
-                    for tunnel in tunnels:
-                        print(f"  - 隧道數據: {tunnel}")
-                
-                return tunnels
-        except Exception as e:
-            print(f"❌ 獲取代理列表失敗: {e}")
-            return []
+            tunnels = await self.list_tunnels(username, password)
+        except UpstreamError as e:
+            # 上游暫時不可用（含熔斷中）時返回仍在保留期內的舊清單，只計一次 stale
+            if e.transient and previous is not None:
+                upstream_cache.inc(endpoint="inventory", result="stale")
+                return previous
+            upstream_cache.inc(endpoint="inventory", result="misses")
+            if not e.transient:
+                # 帳號密碼被拒絕：不能再返回舊清單
+                self._inventories.pop(username)
+                raise CredentialsRejectedError(username, e.status) from e
+            raise
+        upstream_cache.inc(endpoint="inventory", result="misses")
+        
+        content_hash = TunnelInventory.hash(tunnels)
+        if previous is not None and previous.content_hash == content_hash:
+            upstream_cache.inc(endpoint="inventory", result="not_modified")
+            previous.fetched_at = time.monotonic()
+            inventory = previous
+        else:
+            inventory = TunnelInventory(tunnels, content_hash)
+        self._inventories.set(username, (digest, inventory))
+        return inventory
+    
+    def peek_inventory(self, username: str, password: str) -> TunnelInventory:
+        """只讀取本地快取的清單（可能已過 TTL），不會請求上游；沒有快取時返回 None"""
+        entry = self._inventories.peek(username)
+        if entry is None or entry[0] != self._password_digest(password):
+            return None
+        return entry[1]
     
+    def invalidate_user(self, username: str):
+        """清除帳號的隧道清單快取（綁定 / 解綁時調用）"""
+        self._inventories.pop(username)
+    
+    @single_flight
     async def check_tunnel(self, username: str, password: str, 
                           tunnel_name: str, protocol: str, node_name: str) -> dict:
-        """檢查隧道狀態"""
-        try:
-            session = await self._get_session()
-            url = f"{self.base_url}/check_tunnel"
-            async with session.post(
-                url,
-                json={
-                    "username": username,
-                    "password": password,
-                    "tunnelName": tunnel_name,
-                    "protocol": protocol,
-                    "nodeName": node_name
-                }
-            ) as resp:
-                if resp.status != 200:
-                    print(f"❌ 檢查隧道失敗: {resp.status}")
-                    return {"status": "error"}
-                
-                return await resp.json()
-        except Exception as e:
-            print(f"❌ 檢查隧道失敗: {e}")
-            return {"status": "error", "message": str(e)}
-    
-    async def get_nodes(self) -> list:
-        """獲取節點列表"""
-        try:
-            session = await self._get_session()
-            url = f"{self.base_url}/nodes.json"
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    print(f"❌ 獲取節點列表失敗: {resp.status}")
-                    return []
-                
-                data = await resp.json()
-                return data.get("nodes", [])
-        except Exception as e:
-            print(f"❌ 獲取節點列表失敗: {e}")
-            return []
-    
-    async def get_frpc_ini(self, username: str, password: str, node_name: str) -> str:
-        """獲取 frpc.ini 配置文件"""
-        try:
-            session = await self._get_session()
-            url = f"{self.base_url}/get_frpc_ini"
-            async with session.get(
-                url,
-                params={
-                    "username": username,
-                    "password": password,
-                    "nodeName": node_name
-                }
-            ) as resp:
-                if resp.status != 200:
-                    print(f"❌ 獲取 frpc.ini 失敗: HTTP {resp.status}")
-                    return ""
-                
-                return await resp.text()
-        except Exception as e:
-            print(f"❌ 獲取 frpc.ini 失敗: {e}")
-            return ""
-    
-    def parse_frpc_ini(self, ini_content: str) -> dict:
-        """解析 frpc.ini 內容，提取隧道配置"""
-        tunnels = {}
-        lines = ini_content.split('\n')
-        current_tunnel = None
-        
-        for line in lines:
-            line = line.strip()
+        """檢查隧道狀態；上游拒絕請求（4xx）時返回 status 為 "error" 的結果
+        
+        上游不可用（連接錯誤、超時、5xx、限流或熔斷中）時拋出 UpstreamError，由調用方提示，
+        不會被當成隧道離線。
+        """
+        async def handle(resp):
+            if resp.status != 200:
+                return {"status": "error", "message": f"HTTP {resp.status}"}
             
-            # 跳過空行和註釋
-            if not line or line.startswith(';') or line.startswith('#'):
-                continue
+            data = await resp.json()
+            logger.log_payload("check_tunnel", data)
+            logger.api_logger.debug("🔍 隧道狀態 %s/%s: %s", node_name, tunnel_name, LazyJSON(data))
+            return data
+        
+        return await self._request(
+            "check_tunnel", "POST", f"{self.base_url}/check_tunnel", handle, retry=True,
+            breaker_scope=node_name,
+            json={
+                "username": username,
+                "password": password,
+                "tunnelName": tunnel_name,
+                "protocol": protocol,
+                "nodeName": node_name
+            }
+        )
+    
+    async def get_nodes(self, force: bool = False) -> list:
+        """獲取節點列表（帶 TTL 快取）；availablePorts 為 PortRangeSet"""
+        return await self._cached("nodes", self._fetch_nodes, force)
+    
+    async def _fetch_nodes(self, cached: CachedResponse) -> CachedResponse:
+        """請求 nodes.json，失敗時拋出 UpstreamError"""
+        async def handle(resp):
+            if resp.status == 304 and cached:
+                return cached.revalidated()
+            if resp.status != 200:
+                raise UpstreamError("nodes", f"HTTP {resp.status}", resp.status)
             
-            # 檢測隧道區段 [tunnel_name] 或 [tunnel_name,udp]
-            if line.startswith('[') and line.endswith(']'):
-                tunnel_name = line[1:-1].split(',')[0]  # 去掉 ,udp 後綴
-                if tunnel_name.lower() != 'common':
-                    if tunnel_name not in tunnels:
-                        tunnels[tunnel_name] = {
-                            'name': tunnel_name,
-                            'type': 'tcp',
-                            'local_ip': '',
-                            'local_port': '',
-                            'remote_port': '',
-                            'protocol': ''
-                        }
-                    current_tunnel = tunnel_name
-            elif current_tunnel and '=' in line:
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                if key == 'type':
-                    tunnels[current_tunnel]['type'] = value
-                elif key == 'local_ip':
-                    tunnels[current_tunnel]['local_ip'] = value
-                elif key == 'local_port':
-                    tunnels[current_tunnel]['local_port'] = value
-                elif key == 'remote_port':
-                    tunnels[current_tunnel]['remote_port'] = value
-                elif key == 'protocol':
-                    tunnels[current_tunnel]['protocol'] = value
-        
-        return list(tunnels.values())
+            data = await resp.json()
+            logger.log_payload("nodes", data)
+            return CachedResponse(self.normalize_nodes(data.get("nodes", [])), resp.headers)
+        
+        return await self._request(
+            "nodes", "GET", f"{self.base_url}/nodes.json", handle,
+            headers=cached.conditional_headers() if cached else {}
+        )
+    
+    @staticmethod
+    def normalize_nodes(nodes: list) -> list:
+        """把每個節點的 availablePorts 列表轉換為 PortRangeSet（連續端口只保存一個區間）"""
+        for node in nodes:
+            node["availablePorts"] = PortRangeSet(node.get("availablePorts") or ())
+        return nodes
+    
+    @single_flight
+    async def list_tunnels_detailed(self, username: str, password: str, node_name: str) -> list:
+        """流式讀取指定節點的 frpc 配置（INI 或 TOML），邊下載邊解析出隧道詳細配置
+        
+        上游不可用時拋出 UpstreamError（由調用方決定是否略過該節點）。
+        """
+        async def handle(resp):
+            if resp.status != 200:
+                return []
+            return [tunnel async for tunnel in iter_frpc_stream(resp.content)]
+        
+        return await self._request(
+            "get_frpc_ini", "GET", f"{self.base_url}/get_frpc_ini", handle,
+            breaker_scope=node_name,
+            params={
+                "username": username,
+                "password": password,
+                "nodeName": node_name
+            }
+        )
     
     async def get_service_status(self) -> dict:
-        """獲取 TaiwanFRP 服務狀態"""
-        try:
-            session = await self._get_session()
-            url = "https://uptime.taiwanfrp.me/status/service"
-            async with session.get(url) as resp:
+        """請求 TaiwanFRP 服務狀態（不使用快取數據），格式見 api.uptime.parse_service_status"""
+        return await self._refresh("service_status", self._fetch_service_status, allow_stale=False)
+    
+    async def _fetch_service_status(self, cached: CachedResponse) -> CachedResponse:
+        """並發請求狀態頁的監控列表與心跳接口，失敗時拋出 UpstreamError"""
+        def handler(endpoint):
+            async def handle(resp):
                 if resp.status != 200:
-                    print(f"❌ 獲取服務狀態失敗: HTTP {resp.status}")
-                    return {}
-                
-                html = await resp.text()
-                return self.parse_service_status(html)
-        except Exception as e:
-            print(f"❌ 獲取服務狀態失敗: {e}")
-            return {}
+                    raise UpstreamError(endpoint, f"HTTP {resp.status}", resp.status)
+                return await resp.read()
+            return handle
+        
+        api_url = f"{self.uptime_url}/api/status-page"
+        page_body, heartbeat_body = await asyncio.gather(
+            self._request("service_status", "GET", f"{api_url}/{self.uptime_slug}",
+                          handler("service_status")),
+            self._request("service_heartbeat", "GET", f"{api_url}/heartbeat/{self.uptime_slug}",
+                          handler("service_heartbeat"))
+        )
+        status = self.parse_service_status(page_body, heartbeat_body)
+        
+        # 內容未變時解析器返回同一個對象，計為 not_modified
+        if cached is not None and cached.value is status:
+            return cached.revalidated()
+        return CachedResponse(status)
+    
+    def parse_service_status(self, page_body: bytes, heartbeat_body: bytes) -> dict:
+        """解析狀態頁 JSON（按內容哈希快取，未變化時不重新解析）"""
+        return self.status_parser.parse(page_body, heartbeat_body)
     
     async def get_frp_monitor_status(self) -> dict:
-        """從 redbean0721 API 獲取詳細的 FRP 監控數據"""
-        try:
-            session = await self._get_session()
-            url = "https://api.redbean0721.com/api/frp/monitor/query?version=0.63.0&node=all&num=11"
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    print(f"❌ 獲取 FRP 監控數據失敗: HTTP {resp.status}")
-                    return {}
-                
-                data = await resp.json()
-                print(f"✅ 成功獲取 FRP 監控數據")
-                return data
-        except Exception as e:
-            print(f"❌ 獲取 FRP 監控數據失敗: {e}")
-            return {}
+        """從 redbean0721 API 獲取詳細的 FRP 監控數據（不使用快取數據，304 時返回上次的響應）"""
+        return await self._refresh("monitor", self._fetch_frp_monitor_status, allow_stale=False)
+    
+    async def _fetch_frp_monitor_status(self, cached: CachedResponse) -> CachedResponse:
+        """請求 redbean0721 監控 API，失敗時拋出 UpstreamError"""
+        async def handle(resp):
+            if resp.status == 304 and cached:
+                return cached.revalidated()
+            if resp.status != 200:
+                raise UpstreamError("monitor", f"HTTP {resp.status}", resp.status)
+            
+            data = await resp.json()
+            logger.log_payload("monitor", data)
+            return CachedResponse(data, resp.headers)
+        
+        return await self._request(
+            "monitor", "GET",
+            "https://api.redbean0721.com/api/frp/monitor/query?version=0.63.0&node=all&num=11",
+            handle,
+            headers=cached.conditional_headers() if cached else {}
+        )
     
     def format_traffic(self, bytes_value: int) -> str:
         """將字節轉換為可讀的流量格式"""
@@ -215,6 +607,15 @@ class TaiwanFRPClient:
                 return f"{bytes_value:.2f} {unit}"
             bytes_value /= 1024
         return f"{bytes_value:.2f} PB"
+    
+    def format_bitrate(self, bytes_per_second: float) -> str:
+        """將字節/秒轉換為可讀的比特率（Kbps / Mbps / Gbps）"""
+        bits = bytes_per_second * 8
+        for unit in ['bps', 'Kbps', 'Mbps']:
+            if bits < 1000:
+                return f"{bits:.2f} {unit}"
+            bits /= 1000
+        return f"{bits:.2f} Gbps"
 
 # 全局實例
 frp_client = TaiwanFRPClient()
\ No newline at end of file
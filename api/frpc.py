@@ -0,0 +1,284 @@
+"""frpc 配置解析：支持舊版 INI（frpc.ini）與新版 TOML（frpc.toml）
+
+解析器按塊輸入（bytes 或 str），每讀完一個隧道就返回一條 TunnelConfig，
+不需要先把整個響應讀入內存。
+"""
+import codecs
+import json
+import re
+
+# 讀取響應體時每塊的大小（字節）
+CHUNK_SIZE = 64 * 1024
+
+# TOML 子表中的鍵轉換為 INI 鍵時的前綴（例如 [proxies.plugin] unixPath → plugin_unix_path）
+_TOML_TABLE_PREFIXES = {
+    "transport": "",
+    "loadBalancer": "",
+    "plugin": "plugin_",
+    "healthCheck": "health_check_",
+    "metadatas": "meta_",
+    "annotations": "annotation_"
+}
+
+# TOML 配置中出現在代理之前的頂層表
+_TOML_TOP_TABLES = {"auth", "transport", "webServer", "log", "metadatas", "featureGates", "virtualNet"}
+
+_CAMEL_BOUNDARY = re.compile(r"([a-z0-9])([A-Z])")
+
+def _snake_case(key: str) -> str:
+    """localIP → local_ip，customDomains → custom_domains"""
+    return _CAMEL_BOUNDARY.sub(r"\1_\2", key).lower()
+
+class TunnelConfig:
+    """單個隧道的配置；常用字段為屬性，其餘鍵保存在 extra 中
+    
+    兼容原先的字典用法：tunnel['name']、tunnel.get('remote_port', 'N/A')。
+    所有值均為字符串（TOML 的數字、布爾值和數組會轉換為 INI 寫法）。
+    """
+    __slots__ = ("name", "type", "local_ip", "local_port", "remote_port", "protocol", "extra")
+    FIELDS = ("name", "type", "local_ip", "local_port", "remote_port", "protocol")
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.type = "tcp"
+        self.local_ip = ""
+        self.local_port = ""
+        self.remote_port = ""
+        self.protocol = ""
+        self.extra = None
+    
+    def set(self, key: str, value: str):
+        if key in self.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+    
+    def get(self, key: str, default=None):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra is not None:
+            return self.extra.get(key, default)
+        return default
+    
+    def __getitem__(self, key: str):
+        value = self.get(key, KeyError)
+        if value is KeyError:
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS or (self.extra is not None and key in self.extra)
+    
+    def to_dict(self) -> dict:
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    def __repr__(self):
+        return f"TunnelConfig({self.to_dict()!r})"
+
+# TOML 數組元素：雙引號字符串、單引號字符串或裸值
+_ARRAY_ITEM = re.compile(r'"((?:[^"\\]|\\.)*)"|\'([^\']*)\'|([^,\s][^,]*)')
+
+def _toml_string(raw: str) -> str:
+    """解析雙引號字符串（無轉義時直接切片）"""
+    end = raw.rfind('"')
+    body = raw[1:end]
+    if "\\" not in body:
+        return body
+    try:
+        return json.loads(raw[:end + 1])
+    except ValueError:
+        return body
+
+def _toml_value(raw: str) -> str:
+    """把 TOML 值轉為 INI 風格的字符串"""
+    raw = raw.strip()
+    if not raw:
+        return ""
+    first = raw[0]
+    if first == '"':
+        return _toml_string(raw)
+    if first == "'":
+        return raw[1:raw.rfind("'")]
+    if first == "[":
+        items = []
+        for double, single, bare in _ARRAY_ITEM.findall(raw[1:raw.rfind("]")]):
+            if bare:
+                items.append(bare.strip())
+            else:
+                items.append(_toml_string(f'"{double}"') if double else single)
+        return ",".join(items)
+    # 去掉行尾註釋
+    return raw.split("#", 1)[0].strip()
+
+class FrpcParser:
+    """增量解析器：feed() 輸入數據塊並返回已完成的隧道，close() 返回最後一個
+    
+    fmt 為 "ini" 或 "toml"；未指定時根據內容自動判斷。
+    """
+    
+    def __init__(self, fmt: str = None):
+        self.format = fmt
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+        self._current = None
+        self._table = None      # TOML 當前子表，如 "transport"
+        self._in_proxy = False  # TOML 是否處於 [[proxies]] 中
+        self._multiline = None  # TOML 跨行數組：[鍵, 已讀內容]
+        self._key_names = {}    # (子表, 鍵) → INI 鍵名
+    
+    def feed(self, data) -> list:
+        if isinstance(data, bytes):
+            data = self._decoder.decode(data)
+        if not data:
+            return []
+        lines = (self._pending + data).split("\n")
+        self._pending = lines.pop()
+        return self._parse_lines(lines)
+    
+    def close(self) -> list:
+        """輸入結束：處理剩餘內容並返回最後的隧道"""
+        tail = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        records = self._parse_lines(tail.split("\n")) if tail else []
+        if self._current is not None:
+            records.append(self._current)
+            self._current = None
+        return records
+    
+    def _parse_lines(self, lines: list) -> list:
+        records = []
+        for line in lines:
+            line = line.strip()
+            
+            if self._multiline is not None:
+                self._continue_array(line)
+                continue
+            
+            # 跳過空行和註釋
+            if not line or line[0] in ";#":
+                continue
+            
+            if self.format is None:
+                self.format = self._detect(line)
+                if self.format is None:
+                    continue
+            
+            if self.format == "toml":
+                record = self._toml_line(line)
+            else:
+                record = self._ini_line(line)
+            if record is not None:
+                records.append(record)
+        return records
+    
+    @staticmethod
+    def _detect(line: str) -> str:
+        """根據第一行有效內容判斷格式，無法判斷時返回 None"""
+        if line.startswith("[["):
+            return "toml"
+        if line.startswith("[") and line.endswith("]"):
+            return "toml" if line[1:-1].strip().split(".")[0] in _TOML_TOP_TABLES else "ini"
+        if "=" in line:
+            value = line.split("=", 1)[1].strip()
+            if value[:1] in ("\"", "'", "[", "{") or value in ("true", "false"):
+                return "toml"
+        return None
+    
+    def _ini_line(self, line: str):
+        """INI：[隧道名] 或 [隧道名,udp] 開始新隧道，key = value 屬於當前隧道
+        
+        同名的相鄰區段（[隧道名] 後緊跟 [隧道名,udp]）合併為一條記錄，後出現的鍵覆蓋先前的值。
+        """
+        finished = None
+        if line[0] == "[" and line[-1] == "]":
+            tunnel_name = line[1:-1].split(",")[0]  # 去掉 ,udp 後綴
+            if self._current is not None and self._current.name == tunnel_name:
+                return None
+            finished = self._current
+            self._current = None if tunnel_name.lower() == "common" else TunnelConfig(tunnel_name)
+        elif self._current is not None and "=" in line:
+            key, value = line.split("=", 1)
+            self._current.set(key.strip(), value.strip())
+        return finished
+    
+    def _toml_line(self, line: str):
+        """TOML：[[proxies]] 開始新隧道，[proxies.xxx] 為其子表"""
+        finished = None
+        if line[0] == "[":
+            header = line.strip("[]").strip()
+            if line.startswith("[["):
+                finished = self._current
+                self._in_proxy = header == "proxies"
+                self._current = TunnelConfig("") if self._in_proxy else None
+                self._table = None
+            elif header.startswith("proxies.") and self._in_proxy:
+                self._table = header[len("proxies."):]
+            else:
+                # 其他頂層表（auth / webServer 等）
+                finished = self._current
+                self._current = None
+                self._in_proxy = False
+            return finished
+        
+        if self._current is None or "=" not in line:
+            return None
+        
+        key, raw = line.split("=", 1)
+        key = key.strip().strip("\"'")
+        raw = raw.strip()
+        if raw.startswith("[") and raw.count("[") > raw.count("]"):
+            self._multiline = [key, raw]
+            return None
+        self._set_toml(key, _toml_value(raw))
+        return None
+    
+    def _continue_array(self, line: str):
+        key, raw = self._multiline
+        if not line.startswith("#"):
+            raw = f"{raw} {line}"
+        if raw.count("[") <= raw.count("]"):
+            self._multiline = None
+            self._set_toml(key, _toml_value(raw))
+        else:
+            self._multiline[1] = raw
+    
+    @staticmethod
+    def _ini_key(table: str, key: str) -> str:
+        """TOML 鍵名轉換為 INI 鍵名，如 transport.useEncryption → use_encryption"""
+        if "." in key:
+            table, key = key.rsplit(".", 1)
+        if table == "plugin" and key == "type":
+            return "plugin"
+        if table is not None:
+            return _TOML_TABLE_PREFIXES.get(table, _snake_case(table) + "_") + _snake_case(key)
+        return _snake_case(key)
+    
+    def _set_toml(self, key: str, value: str):
+        """按子表前綴和 snake_case 轉換鍵名後寫入當前隧道"""
+        name = self._key_names.get((self._table, key))
+        if name is None:
+            name = self._key_names[(self._table, key)] = self._ini_key(self._table, key)
+        
+        if name == "name":
+            self._current.name = value
+        else:
+            self._current.set(name, value)
+
+def parse_frpc(content: str, fmt: str = None) -> list:
+    """一次性解析完整的配置文本"""
+    parser = FrpcParser(fmt)
+    return parser.feed(content) + parser.close()
+
+async def iter_frpc_stream(stream, fmt: str = None, chunk_size: int = CHUNK_SIZE):
+    """從 aiohttp StreamReader 逐塊讀取並逐個產出 TunnelConfig"""
+    parser = FrpcParser(fmt)
+    async for chunk in stream.iter_chunked(chunk_size):
+        for record in parser.feed(chunk):
+            yield record
+    for record in parser.close():
+        yield record
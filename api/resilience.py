@@ -0,0 +1,151 @@
+"""上游請求的重試與熔斷
+
+- RetryPolicy：冪等請求遇到連接錯誤、超時或 502/503/504/429 時，按指數退避（full jitter）重試，
+  所有嘗試共享一個總時間預算，不會超出命令層的 asyncio.wait_for
+- CircuitBreaker：每個上游端點一個（按 主機/端點[/節點] 區分，一個端點或節點故障不影響其他端點）；
+  連續失敗達到閾值後打開，期間請求立即失敗，冷卻結束後只放行一個探測請求，成功則恢復
+"""
+import asyncio
+import math
+import os
+import random
+import time
+import aiohttp
+from utils.logger import logger
+from utils.metrics import metrics
+
+# 重試：最多嘗試次數、首次退避與退避上限（秒）
+RETRY_ATTEMPTS = int(os.getenv("FRP_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("FRP_RETRY_BASE_DELAY", "0.2"))
+RETRY_MAX_DELAY = float(os.getenv("FRP_RETRY_MAX_DELAY", "2"))
+
+# 熔斷：連續失敗多少次後打開，打開後多久（秒）允許探測
+BREAKER_THRESHOLD = int(os.getenv("FRP_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("FRP_BREAKER_RESET", "30"))
+
+# 視為上游暫時故障、可以重試的狀態碼
+RETRYABLE_STATUS = frozenset({429, 502, 503, 504})
+
+# 視為上游暫時故障、可以重試的異常
+RETRYABLE_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+circuit_state = metrics.gauge(
+    "frp_upstream_circuit_state",
+    "Circuit breaker state per upstream endpoint (0 closed, 1 half-open, 2 open)",
+    ("breaker",)
+)
+upstream_retries = metrics.counter(
+    "frp_upstream_retries_total",
+    "Upstream requests retried after a transient failure",
+    ("endpoint",)
+)
+upstream_throttled = metrics.counter(
+    "frp_upstream_throttled_total",
+    "Upstream requests not sent because the shared upstream budget was exhausted",
+    ("endpoint",)
+)
+upstream_rejected = metrics.counter(
+    "frp_upstream_rejected_total",
+    "Upstream requests failed fast because the endpoint's circuit was open",
+    ("breaker",)
+)
+
+class UpstreamError(Exception):
+    """上游不可用（連接錯誤、超時、5xx 或熔斷中），與「請求成功但結果為空」區分"""
+    
+    def __init__(self, endpoint: str, message: str, status: int = None):
+        super().__init__(message)
+        self.endpoint = endpoint
+        self.status = status
+    
+    @property
+    def transient(self) -> bool:
+        """是否為暫時故障（連接錯誤、超時、5xx、429 或熔斷中）；否則為上游拒絕了請求本身（4xx）"""
+        return self.status is None or self.status >= 500 or self.status in RETRYABLE_STATUS
+
+class CircuitOpenError(UpstreamError):
+    """熔斷器打開，請求未發出"""
+    
+    def __init__(self, endpoint: str, breaker: str, retry_after: float):
+        super().__init__(endpoint, f"{breaker} 暫時不可用，{math.ceil(retry_after)} 秒後重試")
+        self.breaker = breaker
+        self.retry_after = retry_after
+
+class UpstreamThrottledError(UpstreamError):
+    """全局上游請求預算不足，在請求超時前等不到令牌，請求未發出"""
+    
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(endpoint, f"上游請求過於頻繁，約 {math.ceil(retry_after)} 秒後可重試")
+        self.retry_after = retry_after
+
+class RetryPolicy:
+    """指數退避 + full jitter：第 n 次重試前等待 uniform(0, min(max_delay, base * 2^n)) 秒"""
+    
+    def __init__(self, attempts: int = RETRY_ATTEMPTS, base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+class CircuitBreaker:
+    """單個上游端點的熔斷器（closed → open → half_open → closed）"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+    
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD, reset_timeout: float = BREAKER_RESET):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        circuit_state.set(0, breaker=name)
+    
+    def retry_after(self) -> float:
+        """距離允許探測還有多少秒"""
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+    
+    def allow(self) -> bool:
+        """是否允許發出請求；半開狀態下同時只放行一個探測請求"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                return False
+            self._set_state(self.HALF_OPEN)
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+    
+    def record_success(self):
+        self.failures = 0
+        self._probing = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+    
+    def record_failure(self):
+        self._probing = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self._set_state(self.OPEN)
+    
+    def release(self):
+        """請求被取消、沒有結果時釋放探測名額"""
+        self._probing = False
+    
+    def _set_state(self, state: str):
+        previous, self.state = self.state, state
+        circuit_state.set(self.STATE_VALUES[state], breaker=self.name)
+        if state == self.OPEN:
+            logger.log_error("circuit_open", f"{self.name} 連續失敗 {self.failures} 次，熔斷 {self.reset_timeout:.0f} 秒")
+        else:
+            logger.api_logger.info(f"🔌 熔斷器 {self.name}: {previous} → {state}")
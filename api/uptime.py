@@ -0,0 +1,80 @@
+"""Uptime Kuma 狀態頁解析（uptime.taiwanfrp.me）
+
+狀態頁本身是前端渲染的空殼，數據來自兩個 JSON 接口：
+- /api/status-page/<slug>：標題、公告和分組的監控列表
+- /api/status-page/heartbeat/<slug>：每個監控的心跳記錄與 24 小時 / 30 天可用率
+
+ServiceStatusParser 按兩個響應體的內容哈希快取解析結果，內容未變時不重新解析。
+"""
+import hashlib
+import json
+
+# Uptime Kuma 心跳狀態碼
+STATUS_NAMES = {0: "down", 1: "up", 2: "pending", 3: "maintenance"}
+
+def parse_service_status(page: dict, heartbeat: dict) -> dict:
+    """一次遍歷監控列表，合併每個監控的最新心跳和可用率"""
+    heartbeats = heartbeat.get("heartbeatList") or {}
+    uptimes = heartbeat.get("uptimeList") or {}
+    counts = {name: 0 for name in STATUS_NAMES.values()}
+    counts["unknown"] = 0
+    
+    monitors = []
+    for group in page.get("publicGroupList") or ():
+        group_name = group.get("name", "")
+        for monitor in group.get("monitorList") or ():
+            monitor_id = str(monitor.get("id"))
+            beats = heartbeats.get(monitor_id)
+            last = beats[-1] if beats else None
+            status = STATUS_NAMES.get(last.get("status"), "unknown") if last else "unknown"
+            counts[status] += 1
+            
+            monitors.append({
+                "id": monitor.get("id"),
+                "name": monitor.get("name", monitor_id),
+                "group": group_name,
+                "status": status,
+                "ping": last.get("ping") if last else None,
+                "message": last.get("msg", "") if last else "",
+                "checked_at": last.get("time") if last else None,
+                "uptime_24h": uptimes.get(f"{monitor_id}_24"),
+                "uptime_30d": uptimes.get(f"{monitor_id}_720")
+            })
+    
+    config = page.get("config") or {}
+    incident = page.get("incident")
+    return {
+        "title": config.get("title", ""),
+        "monitors": monitors,
+        "counts": counts,
+        "total": len(monitors),
+        "incident": {"title": incident.get("title", ""), "content": incident.get("content", "")} if incident else None
+    }
+
+class ServiceStatusParser:
+    """按響應內容哈希快取解析結果：內容未變時直接返回上次的對象"""
+    
+    def __init__(self):
+        self._digest = None
+        self._result = None
+        self.parsed = 0
+        self.reused = 0
+    
+    @staticmethod
+    def digest(page_body: bytes, heartbeat_body: bytes) -> bytes:
+        hasher = hashlib.blake2b(page_body, digest_size=16)
+        hasher.update(b"\0")
+        hasher.update(heartbeat_body)
+        return hasher.digest()
+    
+    def parse(self, page_body: bytes, heartbeat_body: bytes) -> dict:
+        digest = self.digest(page_body, heartbeat_body)
+        if digest == self._digest:
+            self.reused += 1
+            return self._result
+        
+        result = parse_service_status(json.loads(page_body), json.loads(heartbeat_body))
+        self._digest = digest
+        self._result = result
+        self.parsed += 1
+        return result
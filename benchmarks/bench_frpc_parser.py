@@ -0,0 +1,135 @@
+"""frpc 配置解析基準測試
+
+用法:
+    python benchmarks/bench_frpc_parser.py [--proxies 10000 50000] [--repeat 3]
+
+對生成的 INI / TOML 配置比較：
+- legacy：原先的實現（整段 split 後逐行處理，只保留五個鍵）
+- full：parse_frpc() 一次性解析完整文本
+- stream：按 64KB 塊輸入 bytes（模擬 aiohttp 響應），並用 tracemalloc 記錄峰值內存
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.frpc import CHUNK_SIZE, FrpcParser, parse_frpc
+
+def generate_ini(count: int) -> str:
+    lines = ["[common]", "server_addr = frp.example.com", "server_port = 7000", "token = secret", ""]
+    for i in range(count):
+        kind = "http" if i % 5 == 0 else "tcp"
+        lines.append(f"[tunnel_{i}]" if i % 7 else f"[tunnel_{i},udp]")
+        lines.append(f"type = {kind}")
+        lines.append("local_ip = 127.0.0.1")
+        lines.append(f"local_port = {1000 + i % 50000}")
+        if kind == "http":
+            lines.append(f"custom_domains = t{i}.example.com")
+        else:
+            lines.append(f"remote_port = {10000 + i % 50000}")
+        lines.append("use_encryption = true")
+        lines.append("use_compression = false")
+        lines.append("bandwidth_limit = 1MB")
+        lines.append("")
+    return "\n".join(lines)
+
+def generate_toml(count: int) -> str:
+    lines = ['serverAddr = "frp.example.com"', "serverPort = 7000", 'auth.token = "secret"', ""]
+    for i in range(count):
+        kind = "http" if i % 5 == 0 else "tcp"
+        lines.append("[[proxies]]")
+        lines.append(f'name = "tunnel_{i}"')
+        lines.append(f'type = "{kind}"')
+        lines.append('localIP = "127.0.0.1"')
+        lines.append(f"localPort = {1000 + i % 50000}")
+        if kind == "http":
+            lines.append(f'customDomains = ["t{i}.example.com", "www.t{i}.example.com"]')
+        else:
+            lines.append(f"remotePort = {10000 + i % 50000}")
+        lines.append("transport.useEncryption = true")
+        lines.append("transport.useCompression = false")
+        lines.append('transport.bandwidthLimit = "1MB"')
+        lines.append("")
+    return "\n".join(lines)
+
+def legacy_parse(ini_content: str) -> list:
+    """原先 TaiwanFRPClient.parse_frpc_ini 的實現"""
+    tunnels = {}
+    current_tunnel = None
+    for line in ini_content.split('\n'):
+        line = line.strip()
+        if not line or line.startswith(';') or line.startswith('#'):
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            tunnel_name = line[1:-1].split(',')[0]
+            if tunnel_name.lower() != 'common':
+                if tunnel_name not in tunnels:
+                    tunnels[tunnel_name] = {
+                        'name': tunnel_name, 'type': 'tcp', 'local_ip': '',
+                        'local_port': '', 'remote_port': '', 'protocol': ''
+                    }
+                current_tunnel = tunnel_name
+        elif current_tunnel and '=' in line:
+            key, value = line.split('=', 1)
+            key = key.strip()
+            if key in ('type', 'local_ip', 'local_port', 'remote_port', 'protocol'):
+                tunnels[current_tunnel][key] = value.strip()
+    return list(tunnels.values())
+
+def stream_parse(data: bytes) -> int:
+    """按塊輸入並即時丟棄記錄，模擬邊下載邊處理"""
+    parser = FrpcParser()
+    count = 0
+    for start in range(0, len(data), CHUNK_SIZE):
+        count += len(parser.feed(data[start:start + CHUNK_SIZE]))
+    return count + len(parser.close())
+
+def best_of(repeat: int, func, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def peak_memory(func, *args) -> int:
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="frpc 配置解析基準測試")
+    parser.add_argument("--proxies", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    
+    print(f"{'格式':<6}{'代理數':>8}{'大小':>10}{'方法':>9}{'耗時':>11}{'代理/秒':>12}{'峰值內存':>11}")
+    for count in args.proxies:
+        for fmt, generate in (("ini", generate_ini), ("toml", generate_toml)):
+            text = generate(count)
+            data = text.encode("utf-8")
+            size = f"{len(data) / 1024 / 1024:.1f}MB"
+            
+            cases = [("full", parse_frpc, text), ("stream", stream_parse, data)]
+            if fmt == "ini":
+                cases.insert(0, ("legacy", legacy_parse, text))
+            
+            for name, func, payload in cases:
+                elapsed, result = best_of(args.repeat, func, payload)
+                parsed = result if isinstance(result, int) else len(result)
+                assert parsed == count, (fmt, name, parsed)
+                memory = peak_memory(func, payload) / 1024 / 1024
+                print(
+                    f"{fmt:<6}{count:>8}{size:>10}{name:>9}"
+                    f"{elapsed * 1000:>9.1f}ms{count / elapsed:>12.0f}{memory:>9.1f}MB"
+                )
+
+if __name__ == "__main__":
+    main()
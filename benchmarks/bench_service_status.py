@@ -0,0 +1,102 @@
+"""Uptime Kuma 狀態頁解析基準測試
+
+用法:
+    python benchmarks/bench_service_status.py [--monitors 20 200 2000] [--beats 100] [--repeat 5]
+    python benchmarks/bench_service_status.py --save benchmarks/fixtures --monitors 20
+
+按 Uptime Kuma 接口格式生成監控列表與心跳響應（每個監控 --beats 條心跳），比較：
+- cold：解碼 JSON 並解析（內容變化時的成本）
+- cached：內容未變，只計算哈希並返回上次結果
+--save 將生成的響應寫入目錄，便於與線上抓取的響應對照。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.uptime import ServiceStatusParser
+
+def generate_page(count: int) -> dict:
+    groups = []
+    for group_index in range(0, count, 10):
+        groups.append({
+            "id": group_index // 10 + 1,
+            "name": f"節點組 {group_index // 10 + 1}",
+            "weight": group_index // 10 + 1,
+            "monitorList": [
+                {"id": i + 1, "name": f"node-{i + 1}.taiwanfrp.me", "sendUrl": 0, "type": "port"}
+                for i in range(group_index, min(group_index + 10, count))
+            ]
+        })
+    return {
+        "config": {"slug": "service", "title": "TaiwanFRP 服務狀態", "published": True},
+        "incident": None,
+        "publicGroupList": groups,
+        "maintenanceList": []
+    }
+
+def generate_heartbeat(count: int, beats: int) -> dict:
+    heartbeat_list = {}
+    uptime_list = {}
+    for i in range(1, count + 1):
+        heartbeat_list[str(i)] = [
+            {
+                "status": 0 if (i + b) % 97 == 0 else 1,
+                "time": f"2024-01-01 {b // 60 % 24:02d}:{b % 60:02d}:00.000",
+                "msg": "" if (i + b) % 97 else "connect ECONNREFUSED",
+                "ping": 20 + (i * 7 + b) % 80
+            }
+            for b in range(beats)
+        ]
+        uptime_list[f"{i}_24"] = 1 - (i % 13) / 1000
+        uptime_list[f"{i}_720"] = 1 - (i % 17) / 1000
+    return {"heartbeatList": heartbeat_list, "uptimeList": uptime_list}
+
+def best_of(repeat: int, func, *args):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def cold_parse(page_body: bytes, heartbeat_body: bytes) -> dict:
+    return ServiceStatusParser().parse(page_body, heartbeat_body)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uptime Kuma 狀態頁解析基準測試")
+    parser.add_argument("--monitors", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--beats", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="把生成的響應寫入此目錄")
+    args = parser.parse_args(argv)
+    
+    print(f"{'監控數':>8}{'大小':>10}{'方法':>9}{'耗時':>12}")
+    for count in args.monitors:
+        page_body = json.dumps(generate_page(count), ensure_ascii=False).encode("utf-8")
+        heartbeat_body = json.dumps(generate_heartbeat(count, args.beats)).encode("utf-8")
+        size = f"{(len(page_body) + len(heartbeat_body)) / 1024:.0f}KB"
+        
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            for name, body in (("status-page", page_body), ("heartbeat", heartbeat_body)):
+                with open(os.path.join(args.save, f"{name}-{count}.json"), "wb") as f:
+                    f.write(body)
+        
+        elapsed, result = best_of(args.repeat, cold_parse, page_body, heartbeat_body)
+        assert result["total"] == count, (count, result["total"])
+        print(f"{count:>8}{size:>10}{'cold':>9}{elapsed * 1000:>10.2f}ms")
+        
+        cached = ServiceStatusParser()
+        cached.parse(page_body, heartbeat_body)
+        elapsed, reused = best_of(args.repeat, cached.parse, page_body, heartbeat_body)
+        assert reused is result or reused == result
+        print(f"{count:>8}{size:>10}{'cached':>9}{elapsed * 1000:>10.2f}ms")
+
+if __name__ == "__main__":
+    main()
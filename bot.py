@@ -2,16 +2,90 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import os
+import signal
+import threading
+import time
 from dotenv import load_dotenv
-from utils.logger import logger
 
+# 先載入 .env，之後導入的模組在初始化時才能讀到配置
 load_dotenv()
 
+from utils.logger import logger
+from utils.encryption import pwd_manager
+from utils.history import metrics_history
+from utils.metrics import command_requests, command_duration
+from utils.metrics_server import MetricsServer, METRICS_PORT
+from utils.collectors import register_collector
+from utils.watchdog import watchdog, profiler
+from api.client import frp_client
+
+def _command_duration(interaction: discord.Interaction) -> float:
+    """從 interaction_check 記錄的開始時間計算命令耗時（秒）"""
+    started_at = interaction.extras.get("started_at")
+    return time.perf_counter() - started_at if started_at else None
+
+def _record_command(interaction: discord.Interaction, command_name: str, status: str, error=None):
+    """把命令結果寫入事件日誌和指標"""
+    duration = _command_duration(interaction)
+    logger.log_command_result(interaction.user.id, command_name, status, duration=duration, error=error)
+    command_requests.inc(command=command_name, status=status)
+    if duration is not None:
+        command_duration.observe(duration, command=command_name)
+
+class BotCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """記錄命令開始時間，用於統計耗時"""
+        interaction.extras["started_at"] = time.perf_counter()
+        return True
+    
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        """斜線命令出錯：記錄結構化事件後交給全局錯誤處理"""
+        command_name = interaction.command.name if interaction.command else "unknown"
+        status = "rate_limited" if isinstance(error, app_commands.CommandOnCooldown) else "error"
+        _record_command(interaction, command_name, status, error=error)
+        await on_app_command_error(interaction, error)
+
+class TaiwanFRPBot(commands.Bot):
+    metrics_server = None
+    
+    async def setup_hook(self):
+        """登入後、連接 Gateway 前執行：建立共享的 HTTP 連接池"""
+        await frp_client.start()
+        logger.main_logger.info("✅ HTTP 連接池已建立")
+        
+        # 事件循環看門狗：測量延遲並記錄阻塞循環的調用棧
+        watchdog.start()
+        
+        # kill -USR1 <pid> 開始 / 停止採樣分析（Windows 不支持）
+        try:
+            self.loop.add_signal_handler(signal.SIGUSR1, profiler.toggle, threading.get_ident())
+        except (AttributeError, NotImplementedError):
+            pass
+        
+        # 設置 METRICS_PORT 時啟動 Prometheus 指標服務
+        if METRICS_PORT:
+            register_collector(lambda: self.latency)
+            self.metrics_server = MetricsServer()
+            await self.metrics_server.start()
+    
+    async def close(self):
+        """關閉機器人時釋放 HTTP 連接池並寫回認證數據"""
+        try:
+            await super().close()
+        finally:
+            watchdog.stop()
+            if self.metrics_server is not None:
+                await self.metrics_server.stop()
+            await frp_client.close()
+            await pwd_manager.close()
+            await metrics_history.close()
+            logger.main_logger.info("👋 HTTP 連接池與認證存儲已關閉")
+
 # 機器人配置
 intents = discord.Intents.default()
 intents.message_content = True
 intents.dm_messages = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+bot = TaiwanFRPBot(command_prefix="/", intents=intents, tree_cls=BotCommandTree)
 
 @bot.event
 async def on_ready():
@@ -27,6 +101,8 @@ async def on_ready():
         logger.main_logger.info("✅ ProxyCog 已加載")
         await bot.load_extension("cogs.monitor")
         logger.main_logger.info("✅ MonitorCog 已加載")
+        await bot.load_extension("cogs.admin")
+        logger.main_logger.info("✅ AdminCog 已加載")
         logger.main_logger.info("✅ 所有 Cogs 已加載")
     except Exception as e:
         logger.error_logger.error(f"加載 Cogs 失敗: {e}")
@@ -47,14 +123,30 @@ async def on_ready():
         raise
 
 @bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    """斜線命令成功完成：記錄耗時"""
+    _record_command(interaction, command.name, "ok")
+
+async def _send_error_message(interaction: discord.Interaction, content: str):
+    """回覆錯誤訊息（命令已 defer 時改用 followup）"""
+    if interaction.response.is_done():
+        await interaction.followup.send(content, ephemeral=True)
+    else:
+        await interaction.response.send_message(content, ephemeral=True)
+
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    """全局應用命令錯誤處理"""
-    if isinstance(error, app_commands.CheckFailure):
-        logger.main_logger.warning(f"❌ 命令檢查失敗: {interaction.command.name} (用戶: {interaction.user.id})")
-        await interaction.response.send_message("❌ 您沒有權限執行此命令", ephemeral=True)
+    """全局應用命令錯誤處理（由 BotCommandTree.on_error 調用）"""
+    command_name = interaction.command.name if interaction.command else "unknown"
+    if isinstance(error, app_commands.CommandOnCooldown):
+        # CommandOnCooldown 是 CheckFailure 的子類，需先處理
+        logger.main_logger.info(f"⏳ 命令限流: {command_name} (用戶: {interaction.user.id}, {error.retry_after:.1f}s)")
+        await _send_error_message(interaction, f"⏳ 操作太頻繁，請在 {error.retry_after:.1f} 秒後再試")
+    elif isinstance(error, app_commands.CheckFailure):
+        logger.main_logger.warning(f"❌ 命令檢查失敗: {command_name} (用戶: {interaction.user.id})")
+        await _send_error_message(interaction, "❌ 您沒有權限執行此命令")
     else:
-        logger.error_logger.error(f"命令錯誤 - {interaction.command.name}: {str(error)}")
-        await interaction.response.send_message("❌ 發生未預期的錯誤，已記錄日誌", ephemeral=True)
+        logger.error_logger.error(f"命令錯誤 - {command_name}: {str(error)}")
+        await _send_error_message(interaction, "❌ 發生未預期的錯誤，已記錄日誌")
 
 @bot.event
 async def on_command_error(ctx: commands.Context, error: Exception):
@@ -4,7 +4,9 @@ from discord import app_commands
 import asyncio
 from utils.encryption import pwd_manager
 from utils.logger import logger
+from utils.ratelimit import rate_limit
 from api.client import frp_client
+from api.resilience import UpstreamError
 
 class AccountCog(commands.Cog):
     def __init__(self, bot):
@@ -50,6 +52,7 @@ class AccountCog(commands.Cog):
         return None
     
     @app_commands.command(name="bind", description="綁定您的 TaiwanFRP 帳號")
+    @rate_limit()
     async def bind_account(self, interaction: discord.Interaction):
         """綁定 TaiwanFRP 帳號（私訊執行）"""
         user = interaction.user
@@ -69,7 +72,7 @@ class AccountCog(commands.Cog):
         await interaction.followup.send("✅ 已在私訊中發送指令流程", ephemeral=True)
         
         # 檢查是否已綁定
-        existing = pwd_manager.get_credentials(user.id)
+        existing = await pwd_manager.get_credentials(user.id)
         if existing:
             await dm_channel.send(f"⚠️ 您已綁定帳號: `{existing['username']}`\n如需更改，請先執行 `/unbind`")
             return
@@ -111,13 +114,17 @@ class AccountCog(commands.Cog):
                 return
             
             # 保存加密的認證信息
-            pwd_manager.save_credentials(user.id, username, password)
+            await pwd_manager.save_credentials(user.id, username, password)
+            frp_client.invalidate_user(username)
             await dm_channel.send("✅ 帳號綁定成功！您現在可以使用代理監控命令了。")
             logger.log_bind_attempt(user.id, username, True)
         
         except asyncio.TimeoutError:
             await dm_channel.send("❌ API 驗證超時，請檢查網絡連線後重試")
             logger.log_error("api_timeout", "login 驗證超時", user.id)
+        except UpstreamError as e:
+            await dm_channel.send(f"⚠️ TaiwanFRP 驗證服務暫時無法連接，請稍後再試（{e}）")
+            logger.log_error("bind_upstream", str(e), user.id)
         except Exception as e:
             await dm_channel.send(f"❌ 驗證失敗: {str(e)}")
             logger.log_error("bind_error", str(e), user.id)
@@ -129,7 +136,10 @@ class AccountCog(commands.Cog):
         logger.log_command(user.id, "unbind")
         
         await interaction.response.defer(ephemeral=True)
-        pwd_manager.remove_credentials(user.id)
+        creds = await pwd_manager.get_credentials(user.id)
+        await pwd_manager.remove_credentials(user.id)
+        if creds:
+            frp_client.invalidate_user(creds['username'])
         
         await interaction.followup.send("✅ 帳號已解綁", ephemeral=True)
         logger.log_unbind(user.id)
@@ -141,7 +151,7 @@ class AccountCog(commands.Cog):
         logger.log_command(user.id, "info")
         
         await interaction.response.defer(ephemeral=True)
-        creds = pwd_manager.get_credentials(user.id)
+        creds = await pwd_manager.get_credentials(user.id)
         
         if not creds:
             await interaction.followup.send("❌ 您還未綁定任何帳號，請使用 `/bind` 綁定", ephemeral=True)
@@ -172,10 +182,12 @@ class AccountCog(commands.Cog):
             ("**/info**", "查看綁定的帳號信息（私訊執行）"),
             ("**/tunnels**", "查看您的所有隧道（私訊執行）"),
             ("**/status <隧道名稱>**", "檢查特定隧道的狀態（私訊執行）"),
+            ("**/status_all**", "同時檢查所有隧道的狀態（私訊執行）"),
             ("**/nodes**", "查看可用的節點列表（私訊執行）"),
             ("**/monitor**", "查看伺服器監控狀態（公開頻道）"),
             ("**/frp_stats**", "查看 TaiwanFRP 統計信息（公開頻道）"),
             ("**/service_status**", "查看 TaiwanFRP 實時監控面板（公開頻道）"),
+            ("**/history <節點> [小時]**", "查看節點的歷史監控統計（公開頻道）"),
             ("**/help**", "顯示此幫助信息"),
         ]
         
@@ -0,0 +1,48 @@
+import discord
+from discord.ext import commands
+from discord import app_commands
+import asyncio
+import os
+import threading
+from utils.logger import logger
+from utils.watchdog import profiler, PROFILE_SECONDS
+
+async def is_bot_owner(interaction: discord.Interaction) -> bool:
+    """僅允許機器人擁有者（Discord 應用的 owner / team 成員）"""
+    return await interaction.client.is_owner(interaction.user)
+
+class AdminCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+    
+    @app_commands.command(name="profile", description="（擁有者）對機器人進行採樣分析並返回火焰圖數據")
+    @app_commands.describe(seconds="採樣時長（秒）；採樣進行中時再次執行會立即停止")
+    @app_commands.check(is_bot_owner)
+    async def profile(self, interaction: discord.Interaction,
+                      seconds: app_commands.Range[int, 1, 300] = PROFILE_SECONDS):
+        """採樣事件循環線程的調用棧，結束後以 folded 文件回傳"""
+        user = interaction.user
+        logger.log_command(user.id, "profile", str(seconds))
+        await interaction.response.defer(ephemeral=True)
+        
+        if profiler.running:
+            path = await asyncio.to_thread(profiler.stop)
+        else:
+            profiler.start(threading.get_ident(), duration=seconds)
+            await interaction.followup.send(f"🔬 開始採樣 {seconds} 秒...", ephemeral=True)
+            path = await asyncio.to_thread(profiler.wait)
+        
+        if not path:
+            await interaction.followup.send("❌ 採樣未產生數據", ephemeral=True)
+            return
+        
+        await interaction.followup.send(
+            f"✅ 採樣完成：`{path}`\n可用 flamegraph.pl 或 https://www.speedscope.app 查看",
+            file=discord.File(path, filename=os.path.basename(path)),
+            ephemeral=True
+        )
+
+async def setup(bot):
+    cog = AdminCog(bot)
+    await bot.add_cog(cog)
+    logger.main_logger.info("📌 AdminCog 命令已註冊: /profile")
@@ -2,18 +2,285 @@ import discord
 from discord.ext import commands, tasks
 from discord import app_commands
 import asyncio
+import json
+import os
+import time
+from datetime import datetime
 from utils.logger import logger
+from utils.snapshot import MonitorSnapshot, snapshot_store
+from utils.history import metrics_history
+from utils.rates import rate_engine
+from utils.portrange import PortRangeSet
+from utils.ratelimit import rate_limit
+from utils.render import paginate, render_cache, send_pages
 from api.client import frp_client
+from api.resilience import UpstreamError
+
+# 輪詢間隔（秒）與自動更新狀態訊息的頻道
+POLL_INTERVAL = float(os.getenv("MONITOR_POLL_INTERVAL", "60"))
+STATUS_CHANNEL_ID = int(os.getenv("MONITOR_CHANNEL_ID", "0") or 0)
+STATUS_STATE_FILE = "data/monitor_status.json"
 
 class MonitorCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.server_status_message = None
         self.monitor_channel = None
+        self.update_server_status.change_interval(seconds=POLL_INTERVAL)
         self.update_server_status.start()
     
+    def cog_unload(self):
+        """卸載時停止輪詢"""
+        self.update_server_status.cancel()
+    
+    async def _fetch_snapshot(self) -> MonitorSnapshot:
+        """並發抓取節點列表、監控數據與服務狀態頁，生成新快照
+        
+        每次都直接請求上游（force=True），快照的更新時間即節點列表的抓取時間；
+        節點列表不可用時拋出 UpstreamError（輪詢保留上一個快照）；監控數據和狀態頁不可用時
+        沿用上一個快照中未超過 FRP_CACHE_MAX_STALE 的數據（保留原抓取時間），否則留空，
+        由對應的命令提示無法獲取。
+        """
+        nodes, monitor, services = await asyncio.gather(
+            frp_client.get_nodes(force=True),
+            frp_client.get_frp_monitor_status(),
+            frp_client.get_service_status(),
+            return_exceptions=True
+        )
+        if isinstance(nodes, BaseException):
+            raise nodes
+        
+        previous = snapshot_store.current
+        monitor_at = services_at = None
+        if isinstance(monitor, BaseException):
+            logger.error_logger.error(f"獲取監控數據失敗: {monitor}")
+            monitor, monitor_at = self._carry_over(previous, "monitor")
+        if isinstance(services, BaseException):
+            logger.error_logger.error(f"獲取服務狀態頁失敗: {services}")
+            services, services_at = self._carry_over(previous, "services")
+        
+        # 沿用的監控數據是同一個對象，速率引擎會直接返回上次的結果
+        rates = rate_engine.update_snapshot(monitor, time.monotonic())
+        return MonitorSnapshot(
+            nodes=nodes, monitor=monitor, rates=rates, services=services,
+            monitor_at=monitor_at, services_at=services_at
+        )
+    
+    @staticmethod
+    def _carry_over(previous: MonitorSnapshot, source: str) -> tuple:
+        """返回上一個快照中 source（monitor / services）的 (數據, 抓取時間)；過舊或沒有時返回 ({}, None)"""
+        if previous is None:
+            return {}, None
+        fetched_at = getattr(previous, f"{source}_at")
+        if (datetime.now() - fetched_at).total_seconds() >= frp_client.cache_max_stale:
+            return {}, None
+        return getattr(previous, source), fetched_at
+    
+    async def _get_snapshot(self) -> MonitorSnapshot:
+        """命令使用的快照；輪詢尚未完成第一次時才直接請求上游"""
+        return await asyncio.wait_for(
+            snapshot_store.get(self._fetch_snapshot),
+            timeout=10.0
+        )
+    
+    def _build_monitor_pages(self, snapshot: MonitorSnapshot) -> list:
+        """生成 /monitor 的伺服器監控面板（統計放在第一頁，節點按 embed 限制分頁）"""
+        nodes = snapshot.nodes
+        online_count = 0
+        total_ports = 0
+        node_fields = []
+        
+        for node in nodes:
+            node_name = node.get('name', '未知')
+            node_ip = node.get('ip', 'N/A')
+            ports = node.get('availablePorts') or PortRangeSet()
+            available_ports_count = len(ports)
+            
+            # 簡單判定節點是否在線（有可用端口則判定為在線）
+            is_online = available_ports_count > 0
+            if is_online:
+                online_count += 1
+            total_ports += available_ports_count
+            
+            status_emoji = "🟢" if is_online else "🔴"
+            ports_str = ports.format(max_ranges=5)
+            
+            value = f"{status_emoji} **IP**: `{node_ip}`\n"
+            value += f"**可用端口**: {available_ports_count}\n"
+            value += f"**端口列表**: {ports_str if ports_str else '無'}"
+            
+            node_fields.append((node_name, value, False))
+        
+        summary = (
+            "📊 統計信息",
+            f"**在線節點**: {online_count}/{len(nodes)}\n**總可用端口**: {total_ports}",
+            False
+        )
+        return paginate(
+            "🖥️ TaiwanFRP 伺服器監控面板",
+            [summary, *node_fields],
+            description="實時伺服器狀態監控",
+            color=discord.Color.blue(),
+            footer=f"數據更新於 {snapshot.updated_at:%Y-%m-%d %H:%M:%S}"
+        )
+    
+    def _build_stats_pages(self, snapshot: MonitorSnapshot) -> list:
+        """生成 /frp_stats 的統計信息（節點詳情按 embed 限制分頁）"""
+        nodes = snapshot.nodes
+        
+        # 統計數據
+        total_nodes = len(nodes)
+        online_nodes = sum(1 for n in nodes if n.get('availablePorts'))
+        total_available_ports = sum(len(n.get('availablePorts') or ()) for n in nodes)
+        online_rate = online_nodes / total_nodes * 100 if total_nodes else 0.0
+        
+        fields = [
+            ("🌍 總節點數", str(total_nodes), True),
+            ("🟢 在線節點", str(online_nodes), True),
+            ("📊 在線率", f"{online_rate:.1f}%", True),
+            ("🔌 可用端口", str(total_available_ports), True),
+            # 列出各節點詳細信息
+            ("🏢 節點詳情", "─" * 20, False)
+        ]
+        
+        for node in nodes:
+            node_name = node.get('name', '未知')
+            available_ports = len(node.get('availablePorts') or ())
+            is_online = available_ports > 0
+            status = "🟢 在線" if is_online else "🔴 離線"
+            
+            value = f"{status} - 可用端口: {available_ports}"
+            fields.append((node_name, value, True))
+        
+        return paginate(
+            "📈 TaiwanFRP 服務統計",
+            fields,
+            description="全球伺服器統計信息",
+            color=discord.Color.blurple(),
+            footer=f"數據更新於 {snapshot.updated_at:%Y-%m-%d %H:%M:%S}"
+        )
+    
+    def _build_service_pages(self, snapshot: MonitorSnapshot) -> list:
+        """生成 /service_status 的實時監控面板（全局統計在第一頁，節點按 embed 限制分頁）"""
+        monitor_data = snapshot.monitor
+        result = monitor_data.get('result', {})
+        stats = monitor_data.get('stats', {})
+        node_fields = []
+        
+        # 統計信息
+        total_clients = 0
+        total_connections = 0
+        total_traffic_in = 0
+        total_traffic_out = 0
+        online_servers = 0
+        total_servers = len(result)
+        
+        # 遍歷每個服務器節點
+        for server_name, server_data_list in result.items():
+            if not server_data_list:
+                continue
+            
+            data = server_data_list[0]  # 每個節點只有一條記錄
+            is_online = data.get('is_online', 0)
+            
+            if is_online:
+                online_servers += 1
+            
+            client_counts = data.get('client_counts', 0)
+            cur_conns = data.get('cur_conns', 0)
+            tcp_count = data.get('tcp_count', 0)
+            udp_count = data.get('udp_count', 0)
+            traffic_in = data.get('total_traffic_in', 0)
+            traffic_out = data.get('total_traffic_out', 0)
+            
+            total_clients += client_counts
+            total_connections += cur_conns
+            total_traffic_in += traffic_in
+            total_traffic_out += traffic_out
+            
+            # 節點狀態
+            status_emoji = "🟢" if is_online else "🔴"
+            
+            # 節點詳細信息
+            rate = snapshot.rates.get(server_name)
+            conn_delta = f" ({rate.conn_delta:+d})" if rate and rate.conn_delta else ""
+            node_info = f"{status_emoji} **狀態**: {'在線' if is_online else '離線'}\n"
+            node_info += f"👥 **客戶端**: {client_counts} | 📊 **連接**: {cur_conns}{conn_delta}\n"
+            node_info += f"🔄 **TCP**: {tcp_count} | 📡 **UDP**: {udp_count}\n"
+            node_info += f"📥 **入站**: {frp_client.format_traffic(traffic_in)}\n"
+            node_info += f"📤 **出站**: {frp_client.format_traffic(traffic_out)}\n"
+            if rate:
+                node_info += f"📶 **速率**: ⬇️ {frp_client.format_bitrate(rate.in_bps)} | ⬆️ {frp_client.format_bitrate(rate.out_bps)}"
+                if rate.reset:
+                    node_info += " (計數器已重置)"
+            else:
+                node_info += "📶 **速率**: 計算中…"
+            
+            node_fields.append((server_name, node_info, False))
+        
+        # 全局統計
+        total_in_bps, total_out_bps = rate_engine.aggregate(snapshot.rates)
+        fields = [(
+            "📊 全局統計",
+            f"🌍 **在線節點**: {online_servers}/{total_servers}\n"
+                  f"👥 **總客戶端**: {total_clients}\n"
+                  f"🔗 **活躍連接**: {total_connections}\n"
+                  f"📥 **總入站流量**: {frp_client.format_traffic(total_traffic_in)}\n"
+                  f"📤 **總出站流量**: {frp_client.format_traffic(total_traffic_out)}\n"
+            f"📶 **當前總速率**: ⬇️ {frp_client.format_bitrate(total_in_bps)} | ⬆️ {frp_client.format_bitrate(total_out_bps)}",
+            False
+        )]
+        
+        # 版本信息
+        version_info = stats.get('version', {})
+        if version_info:
+            versions_str = ", ".join([f"{v}: {count}" for v, count in version_info.items()])
+            fields.append(("🔖 版本分佈", versions_str, False))
+        
+        # Uptime Kuma 服務可用性
+        services = snapshot.services
+        if services.get('monitors'):
+            fields.append(("🩺 服務可用性", self._format_services(services), False))
+        
+        return paginate(
+            "🔧 TaiwanFRP 實時監控面板",
+            fields + node_fields,
+            description="全球節點運行狀態與流量統計",
+            color=discord.Color.blue(),
+            footer=f"數據更新於 {snapshot.monitor_at:%Y-%m-%d %H:%M:%S} | 來源: redbean0721 監控 API"
+        )
+    
+    def _render(self, name: str, snapshot: MonitorSnapshot, build) -> list:
+        """同一份快照在 TTL 內只渲染一次，所有用戶共用"""
+        return render_cache.render((name,), snapshot, lambda: build(snapshot))
+    
+    @staticmethod
+    def _format_services(services: dict) -> str:
+        """每個監控一行：狀態、名稱和 24 小時可用率，超出字段長度上限時省略其餘"""
+        icons = {"up": "🟢", "down": "🔴", "pending": "🟡", "maintenance": "🔧"}
+        counts = services['counts']
+        lines = [f"**{counts['up']}/{services['total']}** 正常運行"]
+        incident = services.get('incident')
+        if incident:
+            lines.append(f"📢 {incident['title']}"[:200])
+        
+        monitors = services['monitors']
+        length = sum(len(line) + 1 for line in lines)
+        for index, monitor in enumerate(monitors):
+            uptime = monitor['uptime_24h']
+            line = f"{icons.get(monitor['status'], '⚪')} {monitor['name']}"
+            if uptime is not None:
+                line += f" · {uptime * 100:.2f}%"
+            if length + len(line) + 1 > 1000:
+                lines.append(f"…還有 {len(monitors) - index} 個監控")
+                break
+            lines.append(line)
+            length += len(line) + 1
+        return "\n".join(lines)
+    
     @app_commands.command(name="monitor", description="查看伺服器監控狀態")
     @app_commands.describe(action="選擇動作")
+    @rate_limit()
     async def monitor_status(
         self,
         interaction: discord.Interaction,
@@ -26,80 +293,106 @@ class MonitorCog(commands.Cog):
         await interaction.response.defer(ephemeral=False)
         
         try:
-            nodes = await asyncio.wait_for(
-                frp_client.get_nodes(),
-                timeout=10.0
-            )
+            snapshot = await self._get_snapshot()
+            nodes = snapshot.nodes
             
             if not nodes:
                 await interaction.followup.send("📭 暫無節點信息")
                 return
             
-            embed = discord.Embed(
-                title="🖥️ TaiwanFRP 伺服器監控面板",
-                color=discord.Color.blue(),
-                description="實時伺服器狀態監控"
-            )
-            
-            online_count = 0
-            total_ports = 0
-            
-            for node in nodes:
-                node_name = node.get('name', '未知')
-                node_ip = node.get('ip', 'N/A')
-                ports = node.get('availablePorts', [])
-                available_ports_count = len(ports)
-                
-                # 簡單判定節點是否在線（有可用端口則判定為在線）
-                is_online = available_ports_count > 0
-                if is_online:
-                    online_count += 1
-                total_ports += available_ports_count
-                
-                status_emoji = "🟢" if is_online else "🔴"
-                ports_str = ', '.join(map(str, ports[:5]))
-                if available_ports_count > 5:
-                    ports_str += f", 等 {available_ports_count - 5} 個端口"
-                
-                value = f"{status_emoji} **IP**: `{node_ip}`\n"
-                value += f"**可用端口**: {available_ports_count}\n"
-                value += f"**端口列表**: {ports_str if ports_str else '無'}"
-                
-                embed.add_field(name=node_name, value=value, inline=False)
+            pages = self._render("monitor", snapshot, self._build_monitor_pages)
+            online_count = sum(1 for n in nodes if n.get('availablePorts'))
             
-            embed.add_field(
-                name="📊 統計信息",
-                value=f"**在線節點**: {online_count}/{len(nodes)}\n**總可用端口**: {total_ports}",
-                inline=False
-            )
-            
-            embed.set_footer(text="最後更新於命令執行時")
-            await interaction.followup.send(embed=embed)
+            await send_pages(interaction, pages)
             logger.log_tunnel_check(user.id, "monitor", f"查看監控面板 - {online_count}/{len(nodes)} 節點在線")
         
         except asyncio.TimeoutError:
             await interaction.followup.send("❌ 獲取監控信息超時")
             logger.log_error("monitor_timeout", "get_nodes", user.id)
+        except UpstreamError as e:
+            await interaction.followup.send(f"⚠️ TaiwanFRP 服務暫時無法連接，請稍後再試（{e}）")
+            logger.log_error("monitor_upstream", str(e), user.id)
         except Exception as e:
             await interaction.followup.send(f"❌ 錯誤: {str(e)}")
             logger.log_error("monitor_error", str(e), user.id)
     
-    @tasks.loop(minutes=5)
+    @tasks.loop(seconds=60)
     async def update_server_status(self):
-        """定期更新伺服器狀態（需要配置頻道ID）"""
+        """定期輪詢節點與監控數據，更新共享快照和狀態訊息"""
         try:
-            # 這裡需要通過環境變量或配置文件設定監控頻道
-            # 暫時註解，避免錯誤
-            pass
+            snapshot = await snapshot_store.refresh(self._fetch_snapshot)
         except Exception as e:
             logger.error_logger.error(f"更新伺服器狀態失敗: {e}")
+            return
+        
+        try:
+            await metrics_history.record(snapshot.monitor, snapshot.monitor_at.timestamp())
+        except Exception as e:
+            logger.error_logger.error(f"記錄監控歷史失敗: {e}")
+        
+        if STATUS_CHANNEL_ID:
+            try:
+                await self._update_status_message(snapshot)
+            except Exception as e:
+                logger.error_logger.error(f"更新狀態訊息失敗: {e}")
     
     @update_server_status.before_loop
     async def before_update_server_status(self):
         """等待機器人準備就緒"""
         await self.bot.wait_until_ready()
     
+    def _load_status_message_id(self) -> int:
+        """讀取上次發送的狀態訊息 ID（重啟後繼續編輯同一條訊息）"""
+        try:
+            with open(STATUS_STATE_FILE, "r") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if state.get("channel_id") != STATUS_CHANNEL_ID:
+            return None
+        return state.get("message_id")
+    
+    def _save_status_message_id(self, message_id: int):
+        """保存狀態訊息 ID"""
+        with open(STATUS_STATE_FILE, "w") as f:
+            json.dump({"channel_id": STATUS_CHANNEL_ID, "message_id": message_id}, f)
+    
+    async def _update_status_message(self, snapshot: MonitorSnapshot):
+        """編輯配置頻道中的狀態訊息，不存在時發送一條新的"""
+        if self.monitor_channel is None:
+            self.monitor_channel = (
+                self.bot.get_channel(STATUS_CHANNEL_ID)
+                or await self.bot.fetch_channel(STATUS_CHANNEL_ID)
+            )
+        
+        # 狀態訊息只顯示第一頁（概要）
+        if snapshot.monitor.get('result'):
+            embed = self._render("service_status", snapshot, self._build_service_pages)[0]
+        else:
+            embed = self._render("monitor", snapshot, self._build_monitor_pages)[0]
+        
+        if self.server_status_message is None:
+            message_id = self._load_status_message_id()
+            if message_id:
+                try:
+                    self.server_status_message = await self.monitor_channel.fetch_message(message_id)
+                except discord.NotFound:
+                    self.server_status_message = None
+        
+        if self.server_status_message is not None:
+            try:
+                await self.server_status_message.edit(embed=embed)
+                return
+            except discord.NotFound:
+                # 訊息已被刪除，重新發送
+                self.server_status_message = None
+        
+        self.server_status_message = await self.monitor_channel.send(embed=embed)
+        self._save_status_message_id(self.server_status_message.id)
+    
     @app_commands.command(name="frp_stats", description="查看 TaiwanFRP 統計信息")
+    @rate_limit()
     async def frp_statistics(self, interaction: discord.Interaction):
         """查看 TaiwanFRP 統計信息"""
         user = interaction.user
@@ -108,56 +401,24 @@ class MonitorCog(commands.Cog):
         await interaction.response.defer(ephemeral=False)
         
         try:
-            nodes = await asyncio.wait_for(
-                frp_client.get_nodes(),
-                timeout=10.0
-            )
-            
-            # 統計數據
-            total_nodes = len(nodes)
-            online_nodes = sum(1 for n in nodes if n.get('availablePorts', []))
-            total_available_ports = sum(len(n.get('availablePorts', [])) for n in nodes)
-            
-            embed = discord.Embed(
-                title="📈 TaiwanFRP 服務統計",
-                color=discord.Color.blurple(),
-                description="全球伺服器統計信息"
-            )
-            
-            embed.add_field(name="🌍 總節點數", value=str(total_nodes), inline=True)
-            embed.add_field(name="🟢 在線節點", value=str(online_nodes), inline=True)
-            embed.add_field(name="📊 在線率", value=f"{(online_nodes/total_nodes*100):.1f}%", inline=True)
+            snapshot = await self._get_snapshot()
+            pages = self._render("frp_stats", snapshot, self._build_stats_pages)
             
-            embed.add_field(
-                name="🔌 可用端口",
-                value=str(total_available_ports),
-                inline=True
-            )
-            
-            # 列出各節點詳細信息
-            embed.add_field(name="🏢 節點詳情", value="─" * 20, inline=False)
-            
-            for node in nodes:
-                node_name = node.get('name', '未知')
-                available_ports = len(node.get('availablePorts', []))
-                is_online = available_ports > 0
-                status = "🟢 在線" if is_online else "🔴 離線"
-                
-                value = f"{status} - 可用端口: {available_ports}"
-                embed.add_field(name=node_name, value=value, inline=True)
-            
-            embed.set_footer(text="數據每次查詢時即時更新")
-            await interaction.followup.send(embed=embed)
+            await send_pages(interaction, pages)
             logger.log_tunnel_check(user.id, "stats", "查看統計信息")
         
         except asyncio.TimeoutError:
             await interaction.followup.send("❌ 獲取統計信息超時")
             logger.log_error("stats_timeout", "frp_stats", user.id)
+        except UpstreamError as e:
+            await interaction.followup.send(f"⚠️ TaiwanFRP 服務暫時無法連接，請稍後再試（{e}）")
+            logger.log_error("stats_upstream", str(e), user.id)
         except Exception as e:
             await interaction.followup.send(f"❌ 錯誤: {str(e)}")
             logger.log_error("stats_error", str(e), user.id)
     
     @app_commands.command(name="service_status", description="查看 TaiwanFRP 服務狀態")
+    @rate_limit()
     async def service_status_command(self, interaction: discord.Interaction):
         """查看各節點的詳細監控信息（客戶端數、流量等）"""
         user = interaction.user
@@ -166,97 +427,112 @@ class MonitorCog(commands.Cog):
         await interaction.response.defer(ephemeral=False)
         
         try:
-            monitor_data = await asyncio.wait_for(
-                frp_client.get_frp_monitor_status(),
-                timeout=10.0
-            )
+            snapshot = await self._get_snapshot()
+            monitor_data = snapshot.monitor
             
             if not monitor_data or 'result' not in monitor_data:
                 await interaction.followup.send("❌ 無法獲取監控數據")
                 return
             
+            pages = self._render("service_status", snapshot, self._build_service_pages)
             result = monitor_data.get('result', {})
-            stats = monitor_data.get('stats', {})
+            online_servers = sum(
+                1 for data_list in result.values()
+                if data_list and data_list[0].get('is_online', 0)
+            )
             
-            embed = discord.Embed(
-                title="🔧 TaiwanFRP 實時監控面板",
-                color=discord.Color.blue(),
-                description="全球節點運行狀態與流量統計"
+            await send_pages(interaction, pages)
+            logger.log_command(user.id, "service_status", f"查看監控 - {online_servers}/{len(result)} 節點在線")
+        
+        except asyncio.TimeoutError:
+            await interaction.followup.send("❌ 獲取監控數據超時")
+            logger.log_error("service_timeout", "service_status", user.id)
+        except UpstreamError as e:
+            await interaction.followup.send(f"⚠️ TaiwanFRP 服務暫時無法連接，請稍後再試（{e}）")
+            logger.log_error("service_upstream", str(e), user.id)
+        except Exception as e:
+            await interaction.followup.send(f"❌ 錯誤: {str(e)}")
+            logger.log_error("service_error", str(e), user.id)
+    
+    @app_commands.command(name="history", description="查看節點的歷史監控統計")
+    @app_commands.describe(node="節點名稱", hours="統計最近多少小時（默認 24）")
+    @rate_limit()
+    async def node_history(
+        self,
+        interaction: discord.Interaction,
+        node: str,
+        hours: app_commands.Range[int, 1, 24 * 365] = 24
+    ):
+        """查看節點在一段時間內的 min / avg / max 與平均流量速率"""
+        user = interaction.user
+        logger.log_command(user.id, "history", f"{node} {hours}h")
+        
+        await interaction.response.defer(ephemeral=False)
+        
+        try:
+            stats = await asyncio.wait_for(
+                metrics_history.query(node, hours * 3600),
+                timeout=10.0
             )
             
-            # 統計信息
-            total_clients = 0
-            total_connections = 0
-            total_traffic_in = 0
-            total_traffic_out = 0
-            online_servers = 0
-            total_servers = len(result)
+            if not stats:
+                await interaction.followup.send(f"📭 節點 `{node}` 在最近 {hours} 小時內沒有歷史數據")
+                return
             
-            # 遍歷每個服務器節點
-            for server_name, server_data_list in result.items():
-                if not server_data_list:
-                    continue
-                
-                data = server_data_list[0]  # 每個節點只有一條記錄
-                is_online = data.get('is_online', 0)
-                
-                if is_online:
-                    online_servers += 1
-                
-                client_counts = data.get('client_counts', 0)
-                cur_conns = data.get('cur_conns', 0)
-                tcp_count = data.get('tcp_count', 0)
-                udp_count = data.get('udp_count', 0)
-                traffic_in = data.get('total_traffic_in', 0)
-                traffic_out = data.get('total_traffic_out', 0)
-                
-                total_clients += client_counts
-                total_connections += cur_conns
-                total_traffic_in += traffic_in
-                total_traffic_out += traffic_out
-                
-                # 節點狀態
-                status_emoji = "🟢" if is_online else "🔴"
-                
-                # 節點詳細信息
-                node_info = f"{status_emoji} **狀態**: {'在線' if is_online else '離線'}\n"
-                node_info += f"👥 **客戶端**: {client_counts} | 📊 **連接**: {cur_conns}\n"
-                node_info += f"🔄 **TCP**: {tcp_count} | 📡 **UDP**: {udp_count}\n"
-                node_info += f"📥 **入站**: {frp_client.format_traffic(traffic_in)}\n"
-                node_info += f"📤 **出站**: {frp_client.format_traffic(traffic_out)}"
-                
-                embed.add_field(name=server_name, value=node_info, inline=False)
+            embed = discord.Embed(
+                title=f"📜 節點歷史: {node}",
+                color=discord.Color.teal(),
+                description=f"最近 {hours} 小時 | {stats['resolution']} | 樣本數 {stats['samples']}"
+            )
             
-            # 全局統計
+            labels = (
+                ("client_counts", "👥 客戶端"),
+                ("cur_conns", "📊 連接"),
+                ("tcp_count", "🔄 TCP"),
+                ("udp_count", "📡 UDP")
+            )
+            for key, label in labels:
+                s = stats[key]
+                embed.add_field(
+                    name=label,
+                    value=f"最小 {s['min']} / 平均 {s['avg']:.1f} / 最大 {s['max']}",
+                    inline=True
+                )
+            
+            embed.add_field(name="🟢 在線率", value=f"{stats['uptime'] * 100:.1f}%", inline=True)
             embed.add_field(
-                name="📊 全局統計",
-                value=f"🌍 **在線節點**: {online_servers}/{total_servers}\n"
-                      f"👥 **總客戶端**: {total_clients}\n"
-                      f"🔗 **活躍連接**: {total_connections}\n"
-                      f"📥 **總入站流量**: {frp_client.format_traffic(total_traffic_in)}\n"
-                      f"📤 **總出站流量**: {frp_client.format_traffic(total_traffic_out)}",
+                name="📶 平均流量速率",
+                value=f"📥 {frp_client.format_traffic(stats['rate_in'])}/s\n"
+                      f"📤 {frp_client.format_traffic(stats['rate_out'])}/s",
+                inline=False
+            )
+            embed.add_field(
+                name="📦 期間流量",
+                value=f"📥 {frp_client.format_traffic(stats['traffic_in'])}\n"
+                      f"📤 {frp_client.format_traffic(stats['traffic_out'])}",
                 inline=False
             )
-            
-            # 版本信息
-            version_info = stats.get('version', {})
-            if version_info:
-                versions_str = ", ".join([f"{v}: {count}" for v, count in version_info.items()])
-                embed.add_field(name="🔖 版本分佈", value=versions_str, inline=False)
-            
-            embed.set_footer(text="數據實時更新 | 來源: redbean0721 監控 API")
             
             await interaction.followup.send(embed=embed)
-            logger.log_command(user.id, "service_status", f"查看監控 - {online_servers}/{total_servers} 節點在線")
         
         except asyncio.TimeoutError:
-            await interaction.followup.send("❌ 獲取監控數據超時")
-            logger.log_error("service_timeout", "service_status", user.id)
+            await interaction.followup.send("❌ 查詢歷史數據超時")
+            logger.log_error("history_timeout", node, user.id)
         except Exception as e:
             await interaction.followup.send(f"❌ 錯誤: {str(e)}")
-            logger.log_error("service_error", str(e), user.id)
+            logger.log_error("history_error", str(e), user.id)
+    
+    @node_history.autocomplete("node")
+    async def node_history_autocomplete(self, interaction: discord.Interaction, current: str):
+        """從當前快照提供節點名稱（不請求上游）"""
+        snapshot = snapshot_store.current
+        if snapshot is None:
+            return []
+        current = current.lower()
+        names = [name for name in snapshot.monitor.get('result', {}) if current in name.lower()]
+        return [app_commands.Choice(name=name, value=name) for name in names[:25]]
 
 async def setup(bot):
     cog = MonitorCog(bot)
     await bot.add_cog(cog)
-    logger.main_logger.info("📌 MonitorCog 命令已註冊: /monitor, /frp_stats, /service_status")
+    logger.main_logger.info("📌 MonitorCog 命令已註冊: /monitor, /frp_stats, /service_status, /history")
@@ -2,15 +2,81 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import time
 from utils.encryption import pwd_manager
 from utils.logger import logger
-from api.client import frp_client
+from utils.prefix_index import UserPrefixIndex
+from utils.ratelimit import rate_limit
+from utils.render import paginate, render_cache, send_pages, EMBED_MAX_FIELD_VALUE
+from api.client import frp_client, CredentialsRejectedError
+from api.resilience import UpstreamError
+
+# /tunnels 同時請求節點配置的數量上限
+DETAIL_FETCH_CONCURRENCY = 5
+
+# /status 自動補全索引：最多保存的用戶數，以及閒置多久（秒）後淘汰
+TUNNEL_INDEX_MAX_USERS = 1024
+TUNNEL_INDEX_IDLE_TTL = 1800
+
+# /status_all 同時檢查的隧道數、單個檢查的超時（秒），以及更新進度消息的最小間隔（秒）
+STATUS_CHECK_CONCURRENCY = 8
+STATUS_CHECK_TIMEOUT = 8.0
+STATUS_EDIT_INTERVAL = 1.5
+
+# /status_all 每種結果的顯示方式
+STATUS_LABELS = {
+    "online": "🟢",
+    "offline": "🔴",
+    "timeout": "⏱️",
+    "error": "⚠️",
+    "pending": "⏳"
+}
 
 class ProxyCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # discord_id -> 隧道名稱前綴索引（只由本地快取的清單填充）
+        self._name_index = UserPrefixIndex(maxsize=TUNNEL_INDEX_MAX_USERS, idle_ttl=TUNNEL_INDEX_IDLE_TTL)
+    
+    def _index_inventory(self, discord_id: int, username: str, inventory):
+        """用隧道清單更新自動補全索引；清單內容未變時不重建"""
+        if inventory:
+            self._name_index.update(discord_id, username, inventory.by_name, inventory.content_hash)
+    
+    async def _fetch_tunnel_details(self, creds: dict, tunnels_basic: list, discord_id: int) -> dict:
+        """按節點分組並發獲取 frpc.ini，每個節點只請求一次，返回 {隧道名稱: 詳細配置}"""
+        node_names = list(dict.fromkeys(
+            tunnel.get('node') for tunnel in tunnels_basic if tunnel.get('node')
+        ))
+        semaphore = asyncio.Semaphore(DETAIL_FETCH_CONCURRENCY)
+        
+        async def fetch_node(node_name):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        frp_client.list_tunnels_detailed(
+                            creds['username'],
+                            creds['password'],
+                            node_name
+                        ),
+                        timeout=10.0
+                    )
+                except asyncio.TimeoutError:
+                    logger.log_error("tunnel_detail_timeout", f"節點 {node_name} 配置獲取超時", discord_id)
+                except Exception as e:
+                    logger.log_error("tunnel_detail_error", f"節點 {node_name}: {e}", discord_id)
+                return []
+        
+        results = await asyncio.gather(*(fetch_node(node_name) for node_name in node_names))
+        
+        tunnels_detailed = {}
+        for detailed in results:
+            for tunnel_detail in detailed:
+                tunnels_detailed[tunnel_detail['name']] = tunnel_detail
+        return tunnels_detailed
     
     @app_commands.command(name="tunnels", description="查看您的隧道列表")
+    @rate_limit()
     async def list_tunnels(self, interaction: discord.Interaction):
         """查看您的隧道列表"""
         user = interaction.user
@@ -18,77 +84,86 @@ class ProxyCog(commands.Cog):
         
         await interaction.response.defer(ephemeral=True)
         
-        creds = pwd_manager.get_credentials(user.id)
+        creds = await pwd_manager.get_credentials(user.id)
         if not creds:
             await interaction.followup.send("❌ 您還未綁定帳號，請先執行 `/bind`", ephemeral=True)
             return
         
         try:
             # 先獲取基本隧道列表
-            tunnels_basic = await asyncio.wait_for(
-                frp_client.list_tunnels(creds['username'], creds['password']),
+            inventory = await asyncio.wait_for(
+                frp_client.get_inventory(creds['username'], creds['password']),
                 timeout=10.0
             )
+            tunnels_basic = inventory.tunnels
+            self._index_inventory(user.id, creds['username'], inventory)
             
             if not tunnels_basic:
                 await interaction.followup.send("📭 您目前沒有任何隧道", ephemeral=True)
                 logger.log_tunnel_check(user.id, "none", "無隧道")
                 return
             
-            # 為每個節點獲取詳細配置
-            tunnels_detailed = {}
-            for tunnel_basic in tunnels_basic:
-                node_name = tunnel_basic.get('node', '未知')
-                try:
-                    detailed = await asyncio.wait_for(
-                        frp_client.list_tunnels_detailed(
-                            creds['username'],
-                            creds['password'],
-                            node_name
-                        ),
-                        timeout=10.0
-                    )
-                    for tunnel_detail in detailed:
-                        tunnels_detailed[tunnel_detail['name']] = tunnel_detail
-                except:
-                    pass
-            
-            embed = discord.Embed(
-                title=f"🌐 您的隧道列表 ({len(tunnels_basic)})",
-                color=discord.Color.green(),
-                description=f"帳號: `{creds['username']}`"
-            )
+            # 清單內容未變化時（get_inventory 返回同一個對象）直接重用上次渲染的頁面，不再請求節點配置
+            render_key = ("tunnels", creds['username'])
+            pages = render_cache.lookup(render_key, inventory)
+            if pages is None:
+                # 為每個節點並發獲取詳細配置
+                tunnels_detailed = await self._fetch_tunnel_details(creds, tunnels_basic, user.id)
+                pages = render_cache.store(
+                    render_key, inventory,
+                    self._build_tunnels_pages(creds['username'], tunnels_basic, tunnels_detailed)
+                )
             
-            for tunnel_basic in tunnels_basic:
-                tunnel_name = tunnel_basic.get('name', '未知')
-                node = tunnel_basic.get('node', '未知')
-                
-                # 從詳細配置中提取信息
-                tunnel_detail = tunnels_detailed.get(tunnel_name, {})
-                local_port = tunnel_detail.get('local_port', 'N/A')
-                remote_port = tunnel_detail.get('remote_port', 'N/A')
-                protocol = tunnel_detail.get('protocol', 'N/A')
-                tunnel_type = tunnel_detail.get('type', 'tcp')
-                
-                if protocol == 'N/A':
-                    protocol = f"{tunnel_type.upper()}"
-                
-                value = f"**協議**: {protocol}\n**節點**: {node}\n**本地**: :{local_port} → **遠端**: :{remote_port}"
-                embed.add_field(name=tunnel_name, value=value, inline=False)
-            
-            embed.set_footer(text="使用 /status <隧道名稱> 查看詳細狀態")
-            await interaction.followup.send(embed=embed, ephemeral=True)
+            await send_pages(interaction, pages, ephemeral=True)
             logger.log_tunnel_check(user.id, f"list_all", f"成功獲取 {len(tunnels_basic)} 個隧道")
         
         except asyncio.TimeoutError:
             await interaction.followup.send("❌ 獲取隧道列表超時", ephemeral=True)
             logger.log_error("tunnel_timeout", "list_tunnels", user.id)
+        except CredentialsRejectedError as e:
+            await interaction.followup.send(f"❌ TaiwanFRP 拒絕了您綁定的帳號密碼（{e}），如已修改密碼請重新執行 `/bind`", ephemeral=True)
+            logger.log_error("tunnel_credentials", str(e), user.id)
+        except UpstreamError as e:
+            await interaction.followup.send(f"⚠️ TaiwanFRP 服務暫時無法連接，請稍後再試（{e}）", ephemeral=True)
+            logger.log_error("tunnel_upstream", str(e), user.id)
         except Exception as e:
             await interaction.followup.send(f"❌ 錯誤: {str(e)}", ephemeral=True)
             logger.log_error("tunnel_error", str(e), user.id)
     
+    def _build_tunnels_pages(self, username: str, tunnels_basic: list, tunnels_detailed: dict) -> list:
+        """生成隧道列表（按 embed 限制分頁）"""
+        fields = []
+        for tunnel_basic in tunnels_basic:
+            tunnel_name = tunnel_basic.get('name', '未知')
+            node = tunnel_basic.get('node', '未知')
+            
+            # 從詳細配置中提取信息
+            tunnel_detail = tunnels_detailed.get(tunnel_name, {})
+            local_port = tunnel_detail.get('local_port', 'N/A')
+            remote_port = tunnel_detail.get('remote_port', 'N/A')
+            protocol = tunnel_detail.get('protocol', 'N/A')
+            tunnel_type = tunnel_detail.get('type', 'tcp')
+            
+            if protocol == 'N/A':
+                protocol = f"{tunnel_type.upper()}"
+            
+            value = f"**協議**: {protocol}\n**節點**: {node}\n**本地**: :{local_port} → **遠端**: :{remote_port}"
+            custom_domains = tunnel_detail.get('custom_domains')
+            if custom_domains:
+                value += f"\n**域名**: {custom_domains}"
+            fields.append((tunnel_name, value, False))
+        
+        return paginate(
+            f"🌐 您的隧道列表 ({len(tunnels_basic)})",
+            fields,
+            description=f"帳號: `{username}`",
+            color=discord.Color.green(),
+            footer="使用 /status <隧道名稱> 查看詳細狀態"
+        )
+    
     @app_commands.command(name="status", description="檢查特定隧道的狀態")
     @app_commands.describe(tunnel_name="隧道名稱")
+    @rate_limit()
     async def check_tunnel_status(self, interaction: discord.Interaction, tunnel_name: str):
         """檢查隧道狀態"""
         user = interaction.user
@@ -96,23 +171,28 @@ class ProxyCog(commands.Cog):
         
         await interaction.response.defer(ephemeral=True)
         
-        creds = pwd_manager.get_credentials(user.id)
+        creds = await pwd_manager.get_credentials(user.id)
         if not creds:
             await interaction.followup.send("❌ 您還未綁定帳號，請先執行 `/bind`", ephemeral=True)
             return
         
         try:
-            # 先獲取隧道列表找到對應隧道
-            tunnels = await asyncio.wait_for(
-                frp_client.list_tunnels(creds['username'], creds['password']),
+            # 從隧道清單（帶短 TTL 快取）中按名稱查找
+            requested_at = time.monotonic()
+            inventory = await asyncio.wait_for(
+                frp_client.get_inventory(creds['username'], creds['password']),
                 timeout=10.0
             )
+            tunnel_info = inventory.get(tunnel_name)
             
-            tunnel_info = None
-            for tunnel in tunnels:
-                if tunnel.get('name') == tunnel_name:
-                    tunnel_info = tunnel
-                    break
+            # 快取的清單中找不到時可能是新建的隧道，強制刷新一次
+            if not tunnel_info and inventory.fetched_at < requested_at:
+                inventory = await asyncio.wait_for(
+                    frp_client.get_inventory(creds['username'], creds['password'], force=True),
+                    timeout=10.0
+                )
+                tunnel_info = inventory.get(tunnel_name)
+            self._index_inventory(user.id, creds['username'], inventory)
             
             if not tunnel_info:
                 await interaction.followup.send(f"❌ 找不到隧道 `{tunnel_name}`", ephemeral=True)
@@ -131,15 +211,22 @@ class ProxyCog(commands.Cog):
                 timeout=10.0
             )
             
-            is_online = status_info.get('status') == 'online'
-            status_emoji = "🟢" if is_online else "🔴"
+            # 上游拒絕了檢查請求時狀態未知，不顯示為離線
+            status = status_info.get('status')
+            if status == 'online':
+                status_emoji, status_text, color = "🟢", "線上 ✅", discord.Color.green()
+            elif status == 'error':
+                status_emoji, status_text, color = "⚠️", "無法確認 ⚠️", discord.Color.orange()
+            else:
+                status = "offline"
+                status_emoji, status_text, color = "🔴", "離線 ❌", discord.Color.red()
             
             embed = discord.Embed(
                 title=f"{status_emoji} 隧道狀態: {tunnel_name}",
-                color=discord.Color.green() if is_online else discord.Color.red()
+                color=color
             )
             
-            embed.add_field(name="狀態", value="線上 ✅" if is_online else "離線 ❌", inline=True)
+            embed.add_field(name="狀態", value=status_text, inline=True)
             embed.add_field(name="協議", value=tunnel_info.get('protocol', 'N/A'), inline=True)
             embed.add_field(name="節點", value=tunnel_info.get('node', 'N/A'), inline=True)
             embed.add_field(name="本地", value=f":{tunnel_info.get('local_port', 'N/A')}", inline=True)
@@ -148,18 +235,184 @@ class ProxyCog(commands.Cog):
             if 'info' in status_info:
                 info_text = str(status_info['info'])[:200]
                 embed.add_field(name="詳細信息", value=f"```{info_text}```", inline=False)
+            elif status == "error" and status_info.get('message'):
+                embed.add_field(name="詳細信息", value=f"```{status_info['message'][:200]}```", inline=False)
             
             await interaction.followup.send(embed=embed, ephemeral=True)
-            logger.log_tunnel_check(user.id, tunnel_name, "online" if is_online else "offline")
+            logger.log_tunnel_check(user.id, tunnel_name, status)
         
         except asyncio.TimeoutError:
             await interaction.followup.send(f"❌ 檢查狀態超時", ephemeral=True)
             logger.log_error("status_timeout", f"檢查 {tunnel_name} 超時", user.id)
+        except CredentialsRejectedError as e:
+            await interaction.followup.send(f"❌ TaiwanFRP 拒絕了您綁定的帳號密碼（{e}），如已修改密碼請重新執行 `/bind`", ephemeral=True)
+            logger.log_error("status_credentials", str(e), user.id)
+        except UpstreamError as e:
+            await interaction.followup.send(f"⚠️ TaiwanFRP 服務暫時無法連接，請稍後再試（{e}）", ephemeral=True)
+            logger.log_error("status_upstream", str(e), user.id)
         except Exception as e:
             await interaction.followup.send(f"❌ 錯誤: {str(e)}", ephemeral=True)
             logger.log_error("status_error", str(e), user.id)
     
+    @check_tunnel_status.autocomplete("tunnel_name")
+    async def tunnel_name_autocomplete(self, interaction: discord.Interaction,
+                                       current: str) -> list[app_commands.Choice[str]]:
+        """按前綴補全隧道名稱；只查詢本地索引與快取的清單，不請求上游"""
+        creds = await pwd_manager.get_credentials(interaction.user.id)
+        if not creds:
+            return []
+        
+        names = self._name_index.search(interaction.user.id, creds['username'], current)
+        if names is None:
+            # 索引已被淘汰時從客戶端快取的清單重建（即使已過 TTL，名稱仍可用於補全）
+            inventory = frp_client.peek_inventory(creds['username'], creds['password'])
+            if not inventory:
+                return []
+            self._index_inventory(interaction.user.id, creds['username'], inventory)
+            names = self._name_index.search(interaction.user.id, creds['username'], current)
+        
+        return [app_commands.Choice(name=name[:100], value=name) for name in names or ()]
+    
+    @app_commands.command(name="status_all", description="同時檢查您所有隧道的狀態")
+    @rate_limit()
+    async def check_all_status(self, interaction: discord.Interaction):
+        """並發檢查所有隧道，每完成一部分就更新同一條消息"""
+        user = interaction.user
+        logger.log_command(user.id, "status_all")
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        creds = await pwd_manager.get_credentials(user.id)
+        if not creds:
+            await interaction.followup.send("❌ 您還未綁定帳號，請先執行 `/bind`", ephemeral=True)
+            return
+        
+        try:
+            inventory = await asyncio.wait_for(
+                frp_client.get_inventory(creds['username'], creds['password']),
+                timeout=10.0
+            )
+        except asyncio.TimeoutError:
+            await interaction.followup.send("❌ 獲取隧道列表超時", ephemeral=True)
+            logger.log_error("status_all_timeout", "list_tunnels", user.id)
+            return
+        except CredentialsRejectedError as e:
+            await interaction.followup.send(f"❌ TaiwanFRP 拒絕了您綁定的帳號密碼（{e}），如已修改密碼請重新執行 `/bind`", ephemeral=True)
+            logger.log_error("status_all_credentials", str(e), user.id)
+            return
+        except UpstreamError as e:
+            await interaction.followup.send(f"⚠️ TaiwanFRP 服務暫時無法連接，請稍後再試（{e}）", ephemeral=True)
+            logger.log_error("status_all_upstream", str(e), user.id)
+            return
+        except Exception as e:
+            await interaction.followup.send(f"❌ 錯誤: {str(e)}", ephemeral=True)
+            logger.log_error("status_all_error", str(e), user.id)
+            return
+        
+        tunnels = [tunnel for tunnel in inventory.tunnels if tunnel.get('name')]
+        if not tunnels:
+            await interaction.followup.send("📭 您目前沒有任何隧道", ephemeral=True)
+            return
+        self._index_inventory(user.id, creds['username'], inventory)
+        
+        results = {tunnel['name']: "pending" for tunnel in tunnels}
+        message = await interaction.followup.send(
+            embed=self._build_status_all_embed(tunnels, results), ephemeral=True, wait=True
+        )
+        
+        semaphore = asyncio.Semaphore(STATUS_CHECK_CONCURRENCY)
+        
+        async def check(tunnel):
+            name = tunnel['name']
+            async with semaphore:
+                try:
+                    status_info = await asyncio.wait_for(
+                        frp_client.check_tunnel(
+                            creds['username'],
+                            creds['password'],
+                            name,
+                            tunnel.get('protocol', 'tcp'),
+                            tunnel.get('node', 'unknown')
+                        ),
+                        timeout=STATUS_CHECK_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    logger.log_error("status_timeout", f"檢查 {name} 超時", user.id)
+                    return name, "timeout"
+                except UpstreamError as e:
+                    # 上游不可用（含熔斷中）：只標記這條隧道，其餘檢查繼續
+                    logger.log_error("status_upstream", f"檢查 {name} 失敗: {e}", user.id)
+                    return name, "error"
+                except Exception as e:
+                    logger.log_error("status_error", f"檢查 {name} 失敗: {e}", user.id)
+                    return name, "error"
+            status = status_info.get('status')
+            return name, status if status in ("online", "offline") else "error"
+        
+        tasks = [asyncio.create_task(check(tunnel)) for tunnel in tunnels]
+        last_edit = time.monotonic()
+        pending_edit = False
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                name, status = await next_result
+                results[name] = status
+                pending_edit = True
+                
+                # 限制編輯頻率，避免觸發 Discord 的速率限制
+                if time.monotonic() - last_edit >= STATUS_EDIT_INTERVAL:
+                    await self._edit_progress(message, self._build_status_all_embed(tunnels, results), user.id)
+                    last_edit = time.monotonic()
+                    pending_edit = False
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        if pending_edit:
+            await self._edit_progress(message, self._build_status_all_embed(tunnels, results), user.id)
+        online = sum(1 for status in results.values() if status == "online")
+        logger.log_tunnel_check(user.id, "status_all", f"{online}/{len(results)} 線上")
+    
+    async def _edit_progress(self, message: discord.WebhookMessage, embed: discord.Embed, discord_id: int):
+        """更新進度消息；失敗時只記錄，不中斷其餘檢查"""
+        try:
+            await message.edit(embed=embed)
+        except discord.HTTPException as e:
+            logger.log_error("status_all_edit", str(e), discord_id)
+    
+    def _build_status_all_embed(self, tunnels: list, results: dict) -> discord.Embed:
+        """按隧道清單順序列出結果，描述超出長度上限時省略剩餘條目"""
+        done = sum(1 for status in results.values() if status != "pending")
+        counts = {label: 0 for label in STATUS_LABELS}
+        for status in results.values():
+            counts[status] += 1
+        
+        if done < len(results):
+            title, color = f"⏳ 正在檢查隧道 ({done}/{len(results)})", discord.Color.blue()
+        elif counts["online"] == len(results):
+            title, color = "📋 隧道狀態總覽", discord.Color.green()
+        else:
+            title, color = "📋 隧道狀態總覽", discord.Color.orange()
+        embed = discord.Embed(title=title, color=color)
+        
+        lines = []
+        length = 0
+        for index, tunnel in enumerate(tunnels):
+            line = f"{STATUS_LABELS[results[tunnel['name']]]} `{tunnel['name']}` · {tunnel.get('node', 'N/A')}"
+            if length + len(line) + 1 > 3900:
+                lines.append(f"…還有 {len(tunnels) - index} 個隧道")
+                break
+            lines.append(line)
+            length += len(line) + 1
+        embed.description = "\n".join(lines)
+        
+        embed.add_field(name="線上", value=str(counts["online"]), inline=True)
+        embed.add_field(name="離線", value=str(counts["offline"]), inline=True)
+        embed.add_field(name="超時 / 錯誤", value=f"{counts['timeout']} / {counts['error']}", inline=True)
+        embed.set_footer(text="使用 /status <隧道名稱> 查看單個隧道的詳細信息")
+        return embed
+    
     @app_commands.command(name="nodes", description="查看可用的節點")
+    @rate_limit()
     async def list_nodes(self, interaction: discord.Interaction):
         """查看可用的節點"""
         user = interaction.user
@@ -177,29 +430,40 @@ class ProxyCog(commands.Cog):
                 await interaction.followup.send("📭 暫無可用節點", ephemeral=True)
                 return
             
-            embed = discord.Embed(
-                title=f"🌍 可用節點 ({len(nodes)})",
-                color=discord.Color.blue()
-            )
-            
-            for node in nodes:
-                node_name = node.get('name', '未知')
-                node_ip = node.get('ip', 'N/A')
-                ports_str = ', '.join(map(str, node.get('availablePorts', [])))
-                
-                value = f"**IP**: `{node_ip}`\n**可用端口**: {ports_str if ports_str else '無可用端口'}"
-                embed.add_field(name=node_name, value=value, inline=False)
-            
-            await interaction.followup.send(embed=embed, ephemeral=True)
+            # nodes 列表在客戶端快取期間是同一個對象，所有用戶共用渲染結果
+            pages = render_cache.render(("nodes",), nodes, lambda: self._build_nodes_pages(nodes))
+            await send_pages(interaction, pages, ephemeral=True)
         
         except asyncio.TimeoutError:
             await interaction.followup.send("❌ 獲取節點列表超時", ephemeral=True)
             logger.log_error("nodes_timeout", "get_nodes", user.id)
+        except UpstreamError as e:
+            await interaction.followup.send(f"⚠️ TaiwanFRP 服務暫時無法連接，請稍後再試（{e}）", ephemeral=True)
+            logger.log_error("nodes_upstream", str(e), user.id)
         except Exception as e:
             await interaction.followup.send(f"❌ 錯誤: {str(e)}", ephemeral=True)
             logger.log_error("nodes_error", str(e), user.id)
+    
+    @staticmethod
+    def _build_nodes_pages(nodes: list) -> list:
+        """生成節點列表；端口按連續區間顯示，過長時截斷到字段長度上限"""
+        fields = []
+        for node in nodes:
+            node_name = node.get('name', '未知')
+            node_ip = node.get('ip', 'N/A')
+            prefix = f"**IP**: `{node_ip}`\n**可用端口**: "
+            ports = node.get('availablePorts')
+            if ports:
+                # 按區間渲染，超出字段長度時以「等 N 個端口」結尾
+                ports_str = ports.format(max_chars=EMBED_MAX_FIELD_VALUE - len(prefix))
+            else:
+                ports_str = '無可用端口'
+            value = prefix + ports_str
+            fields.append((node_name, value, False))
+        
+        return paginate(f"🌍 可用節點 ({len(nodes)})", fields, color=discord.Color.blue())
 
 async def setup(bot):
     cog = ProxyCog(bot)
     await bot.add_cog(cog)
-    logger.main_logger.info("📌 ProxyCog 命令已註冊: /tunnels, /status, /nodes")
+    logger.main_logger.info("📌 ProxyCog 命令已註冊: /tunnels, /status, /status_all, /nodes")
@@ -0,0 +1,91 @@
+import time
+import weakref
+from collections import OrderedDict
+from utils.metrics import metrics
+
+cache_entries = metrics.gauge(
+    "bot_cache_entries",
+    "Entries held by in-process caches",
+    ("cache",)
+)
+cache_evictions = metrics.counter(
+    "bot_cache_evictions_total",
+    "Entries evicted from in-process caches because they were full",
+    ("cache",)
+)
+
+# 帶名稱的快取，抓取 /metrics 時導出條目數
+_named_caches = weakref.WeakValueDictionary()
+
+class TTLCache:
+    """有容量上限的 LRU 快取，條目超過 TTL 後自動失效；指定 name 時導出條目數和淘汰次數"""
+    
+    def __init__(self, maxsize=1024, ttl=600.0, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()  # key -> (過期時間, 值)
+        self.hits = 0
+        self.misses = 0
+        if name is not None:
+            _named_caches[name] = self
+    
+    def get(self, key, default=None):
+        """讀取快取，命中時將條目移到最近使用的位置"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key, value, ttl=None):
+        """寫入快取，超出容量時淘汰最久未使用的條目"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            if self.name is not None:
+                cache_evictions.inc(cache=self.name)
+    
+    def peek(self, key, default=None):
+        """讀取未過期的條目，不更新 LRU 順序也不計入命中統計"""
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+    
+    def pop(self, key, default=None):
+        """移除並返回條目（用於主動失效）"""
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+    
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    @property
+    def hit_ratio(self) -> float:
+        """命中率（尚無請求時為 0）"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+def _collect_cache_sizes():
+    """抓取指標時更新各快取的條目數"""
+    for name, cache in list(_named_caches.items()):
+        cache_entries.set(len(cache), cache=name)
+
+metrics.add_collector(_collect_cache_sizes)
@@ -0,0 +1,39 @@
+from utils.metrics import metrics
+from utils.encryption import pwd_manager
+from utils.render import render_cache
+from api.client import frp_client
+
+# 以下模組在導入時註冊各自的指標（熔斷、限流、看門狗、速率），單獨運行 /metrics 服務時也需要導入
+import api.resilience
+import utils.ratelimit
+import utils.rates
+import utils.watchdog
+
+# 抓取 /metrics 時才計算的計量值
+gateway_latency = metrics.gauge(
+    "bot_gateway_latency_seconds",
+    "Discord gateway heartbeat latency in seconds"
+)
+credential_store_size = metrics.gauge(
+    "bot_credential_store_users",
+    "Number of users with stored credentials"
+)
+cache_hit_ratio = metrics.gauge(
+    "bot_cache_hit_ratio",
+    "Hit ratio of in-process caches",
+    ("cache",)
+)
+
+def register_collector(latency=None):
+    """註冊抓取指標時的回調；latency 為返回 Gateway 延遲的函數（單獨運行時沒有 Gateway，傳 None）"""
+    async def collect_bot_metrics():
+        """更新延遲、認證存儲大小和各快取命中率"""
+        if latency is not None:
+            gateway_latency.set(latency())
+        credential_store_size.set(await pwd_manager.count())
+        cache_hit_ratio.set(pwd_manager.credential_cache.hit_ratio, cache="credentials")
+        for name in (*frp_client.cache_ttls, "inventory"):
+            cache_hit_ratio.set(frp_client.cache_ratio(name), cache=name)
+        cache_hit_ratio.set(render_cache.hit_ratio, cache="render")
+    
+    metrics.add_collector(collect_bot_metrics)
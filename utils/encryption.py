@@ -1,17 +1,26 @@
 from cryptography.fernet import Fernet
-import json
 import os
 from pathlib import Path
+from utils.cache import TTLCache
+from utils.storage import create_backend
 
 class PasswordManager:
-    def __init__(self, key_file="data/twfrp.key", db_file="data/users.json"):
+    def __init__(self, key_file="data/twfrp.key", backend=None,
+                 cache_size=1024, cache_ttl=600.0):
         self.key_file = key_file
-        self.db_file = db_file
         self._ensure_files()
+        
+        # 存儲後端（默認按 CREDENTIAL_BACKEND 環境變量選擇 json / sqlite）
+        self.backend = backend or create_backend()
+        
+        # 密鑰只讀取一次，Fernet 對象重複使用
+        self._cipher = None
+        # 解密後的認證信息快取（按 Discord ID），綁定/解綁時失效
+        self.credential_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl, name="credentials")
     
     def _ensure_files(self):
-        """確保密鑰和資料庫文件存在"""
-        Path("data").mkdir(exist_ok=True)
+        """確保密鑰文件存在"""
+        Path(self.key_file).parent.mkdir(parents=True, exist_ok=True)
         
         # 生成密鑰（第一次運行）
         if not os.path.exists(self.key_file):
@@ -20,17 +29,14 @@ class PasswordManager:
                 f.write(key)
             print(f"✅ 密鑰已生成: {self.key_file}")
             print("⚠️  請妥善保管此文件，丟失將無法解密密碼！")
-        
-        # 初始化資料庫
-        if not os.path.exists(self.db_file):
-            with open(self.db_file, "w") as f:
-                json.dump({}, f)
     
     def _get_cipher(self):
-        """獲取加密對象"""
-        with open(self.key_file, "rb") as f:
-            key = f.read()
-        return Fernet(key)
+        """獲取加密對象（首次調用時讀取密鑰並快取）"""
+        if self._cipher is None:
+            with open(self.key_file, "rb") as f:
+                key = f.read()
+            self._cipher = Fernet(key)
+        return self._cipher
     
     def encrypt_password(self, password: str) -> str:
         """加密密碼"""
@@ -47,47 +53,51 @@ class PasswordManager:
         except Exception as e:
             raise ValueError(f"❌ 密碼解密失敗: {e}")
     
-    def save_credentials(self, discord_id: int, username: str, password: str):
+    async def save_credentials(self, discord_id: int, username: str, password: str):
         """保存加密的帳號密碼"""
         encrypted_pass = self.encrypt_password(password)
-        
-        with open(self.db_file, "r") as f:
-            data = json.load(f)
-        
-        data[str(discord_id)] = {
+        user_data = {
             "username": username,
             "password": encrypted_pass
         }
         
-        with open(self.db_file, "w") as f:
-            json.dump(data, f, indent=2)
+        await self.backend.set(str(discord_id), user_data)
+        # 寫入完成後再失效，避免並發查詢把舊值重新放回快取
+        self.credential_cache.pop(str(discord_id))
         
         print(f"✅ 已保存用戶 {discord_id} 的認證信息")
     
-    def get_credentials(self, discord_id: int) -> dict:
+    async def get_credentials(self, discord_id: int) -> dict:
         """獲取解密後的帳號密碼"""
-        with open(self.db_file, "r") as f:
-            data = json.load(f)
+        cached = self.credential_cache.get(str(discord_id))
+        if cached is not None:
+            return dict(cached)
         
-        if str(discord_id) not in data:
+        user_data = await self.backend.get(str(discord_id))
+        if user_data is None:
             return None
         
-        user_data = data[str(discord_id)]
-        return {
+        creds = {
             "username": user_data["username"],
             "password": self.decrypt_password(user_data["password"])
         }
+        self.credential_cache.set(str(discord_id), creds)
+        return dict(creds)
     
-    def remove_credentials(self, discord_id: int):
+    async def remove_credentials(self, discord_id: int):
         """刪除用戶認證信息"""
-        with open(self.db_file, "r") as f:
-            data = json.load(f)
-        
-        if str(discord_id) in data:
-            del data[str(discord_id)]
-            with open(self.db_file, "w") as f:
-                json.dump(data, f, indent=2)
+        deleted = await self.backend.delete(str(discord_id))
+        self.credential_cache.pop(str(discord_id))
+        if deleted:
             print(f"✅ 已刪除用戶 {discord_id} 的認證信息")
+    
+    async def count(self) -> int:
+        """已綁定的用戶數量"""
+        return await self.backend.count()
+    
+    async def close(self):
+        """寫回未完成的變更並關閉存儲後端"""
+        await self.backend.close()
 
 # 全局實例
 pwd_manager = PasswordManager()
\ No newline at end of file
@@ -0,0 +1,231 @@
+import os
+import sqlite3
+import time
+from utils.rates import counter_delta
+from utils.storage import SQLiteWorker
+
+# 需要保存 min / avg / max 的計量指標（與監控 API 字段對應）
+GAUGES = ("client_counts", "cur_conns", "tcp_count", "udp_count")
+
+# 保留策略（秒）：原始樣本 → 5 分鐘彙總 → 1 小時彙總
+RAW_RETENTION = int(os.getenv("HISTORY_RAW_RETENTION", str(24 * 3600)))
+ROLLUP_5M_RETENTION = int(os.getenv("HISTORY_5M_RETENTION", str(30 * 24 * 3600)))
+ROLLUP_1H_RETENTION = int(os.getenv("HISTORY_1H_RETENTION", str(365 * 24 * 3600)))
+
+# 每隔多久清理一次過期數據（秒）
+PRUNE_INTERVAL = 3600
+
+# 與上一個樣本相隔超過此秒數（例如機器人停機）時不計流量增量，避免把整段停機的流量算進一個樣本
+MAX_SAMPLE_GAP = int(os.getenv("HISTORY_MAX_GAP", "300"))
+
+ROLLUP_TABLES = (("rollup_5m", 300), ("rollup_1h", 3600))
+
+class MetricsHistory:
+    """FRP 監控指標的時間序列存儲（SQLite + 分級彙總表）"""
+    
+    def __init__(self, db_file=None):
+        self.db_file = db_file or os.getenv("HISTORY_DB", "data/history.db")
+        self._conn = None
+        self._last_totals = {}  # node -> (ts, traffic_in, traffic_out)，用於計算增量
+        self._last_payload = None
+        self._last_prune = 0.0
+        self._db = SQLiteWorker(self.db_file, "history", self._open)
+    
+    def _open(self, conn: sqlite3.Connection):
+        """建立表格並載入每個節點的最後樣本（在資料庫線程上執行）"""
+        self._conn = conn
+        gauge_columns = ", ".join(f"{g} INTEGER NOT NULL" for g in GAUGES)
+        # elapsed：增量對應的秒數（與上一個樣本的間隔，沒有可用的上一個樣本時為 0）
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            "node TEXT NOT NULL, ts INTEGER NOT NULL, online INTEGER NOT NULL, "
+            f"{gauge_columns}, "
+            "traffic_in INTEGER NOT NULL, traffic_out INTEGER NOT NULL, "
+            "in_delta INTEGER NOT NULL, out_delta INTEGER NOT NULL, "
+            "elapsed INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (node, ts)) WITHOUT ROWID"
+        )
+        
+        rollup_columns = ", ".join(
+            f"{g}_min INTEGER NOT NULL, {g}_max INTEGER NOT NULL, {g}_sum INTEGER NOT NULL"
+            for g in GAUGES
+        )
+        for table, _ in ROLLUP_TABLES:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "node TEXT NOT NULL, bucket INTEGER NOT NULL, n INTEGER NOT NULL, "
+                "online_sum INTEGER NOT NULL, "
+                f"{rollup_columns}, "
+                "in_delta INTEGER NOT NULL, out_delta INTEGER NOT NULL, "
+                "elapsed INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (node, bucket)) WITHOUT ROWID"
+            )
+        
+        # 舊版資料庫沒有 elapsed 列：補上後舊數據的間隔記為 0
+        for table in ("samples", *(t for t, _ in ROLLUP_TABLES)):
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if "elapsed" not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN elapsed INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+        
+        # 載入每個節點最後一條樣本，重啟後按間隔判斷第一個增量是否可用
+        rows = self._conn.execute(
+            "SELECT s.node, s.ts, s.traffic_in, s.traffic_out FROM samples s "
+            "JOIN (SELECT node, MAX(ts) AS ts FROM samples GROUP BY node) m "
+            "ON s.node = m.node AND s.ts = m.ts"
+        ).fetchall()
+        self._last_totals = {node: (ts, t_in, t_out) for node, ts, t_in, t_out in rows}
+    
+    async def record(self, monitor_data: dict, ts: float = None):
+        """記錄一次監控數據（同一份響應不會重複記錄）
+        
+        增量只在與上一個樣本相隔不超過 MAX_SAMPLE_GAP 時計入，並記錄對應的間隔秒數。
+        """
+        result = monitor_data.get('result') if monitor_data else None
+        if not result or monitor_data is self._last_payload:
+            return
+        self._last_payload = monitor_data
+        
+        ts = int(ts or time.time())
+        rows = []
+        for node, data_list in result.items():
+            if not data_list:
+                continue
+            data = data_list[0]
+            traffic_in = int(data.get('total_traffic_in', 0))
+            traffic_out = int(data.get('total_traffic_out', 0))
+            prev_ts, prev_in, prev_out = self._last_totals.get(node, (None, None, None))
+            if prev_ts is not None and ts <= prev_ts:
+                continue
+            self._last_totals[node] = (ts, traffic_in, traffic_out)
+            
+            if prev_ts is None or ts - prev_ts > MAX_SAMPLE_GAP:
+                in_delta = out_delta = elapsed = 0
+            else:
+                in_delta = counter_delta(traffic_in, prev_in)
+                out_delta = counter_delta(traffic_out, prev_out)
+                elapsed = ts - prev_ts
+            
+            rows.append((
+                node, ts, 1 if data.get('is_online', 0) else 0,
+                *(int(data.get(g, 0)) for g in GAUGES),
+                traffic_in, traffic_out,
+                in_delta, out_delta, elapsed
+            ))
+        
+        if rows:
+            await self._db.run(self._insert, rows, ts)
+    
+    def _insert(self, rows: list, ts: int):
+        """寫入原始樣本並更新各級彙總"""
+        placeholders = ", ".join("?" * len(rows[0]))
+        gauge_updates = ", ".join(
+            f"{g}_min = MIN({g}_min, excluded.{g}_min), "
+            f"{g}_max = MAX({g}_max, excluded.{g}_max), "
+            f"{g}_sum = {g}_sum + excluded.{g}_sum"
+            for g in GAUGES
+        )
+        
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO samples VALUES ({placeholders})",
+                rows
+            )
+            for table, width in ROLLUP_TABLES:
+                bucket = ts - ts % width
+                rollup_rows = [
+                    (row[0], bucket, 1, row[2],
+                     *(v for value in row[3:3 + len(GAUGES)] for v in (value, value, value)),
+                     *row[-3:])
+                    for row in rows
+                ]
+                rollup_placeholders = ", ".join("?" * len(rollup_rows[0]))
+                self._conn.executemany(
+                    f"INSERT INTO {table} VALUES ({rollup_placeholders}) "
+                    "ON CONFLICT(node, bucket) DO UPDATE SET "
+                    "n = n + 1, online_sum = online_sum + excluded.online_sum, "
+                    f"{gauge_updates}, "
+                    "in_delta = in_delta + excluded.in_delta, "
+                    "out_delta = out_delta + excluded.out_delta, "
+                    "elapsed = elapsed + excluded.elapsed",
+                    rollup_rows
+                )
+        
+        if ts - self._last_prune >= PRUNE_INTERVAL:
+            self._prune(ts)
+            self._last_prune = ts
+    
+    def _prune(self, now: int):
+        """刪除超出保留期限的數據"""
+        with self._conn:
+            self._conn.execute("DELETE FROM samples WHERE ts < ?", (now - RAW_RETENTION,))
+            self._conn.execute("DELETE FROM rollup_5m WHERE bucket < ?", (now - ROLLUP_5M_RETENTION,))
+            self._conn.execute("DELETE FROM rollup_1h WHERE bucket < ?", (now - ROLLUP_1H_RETENTION,))
+    
+    async def query(self, node: str, window: int, now: float = None) -> dict:
+        """統計節點在最近 window 秒內的 min / avg / max 與平均流量速率"""
+        return await self._db.run(self._query, node, int(window), int(now or time.time()))
+    
+    def _query(self, node: str, window: int, now: int) -> dict:
+        """流量按樣本間隔計算：速率 = 增量總和 / 間隔總和，不受停機和窗口起點前的數據影響"""
+        since = now - window
+        
+        # 選擇能覆蓋整個窗口的最細粒度表
+        if window <= RAW_RETENTION:
+            table, resolution, time_col = "samples", "原始樣本", "ts"
+            gauge_select = ", ".join(f"MIN({g}), AVG({g}), MAX({g})" for g in GAUGES)
+            count_select = "COUNT(*), SUM(online)"
+            # 間隔跨過窗口起點的樣本只計入窗口內的部分
+            covered = f"MIN(elapsed, ts - {since})"
+            traffic_select = (
+                f"SUM(CASE WHEN elapsed > 0 THEN in_delta * 1.0 * {covered} / elapsed END), "
+                f"SUM(CASE WHEN elapsed > 0 THEN out_delta * 1.0 * {covered} / elapsed END), "
+                f"SUM({covered})"
+            )
+        else:
+            if window <= ROLLUP_5M_RETENTION:
+                table, resolution = "rollup_5m", "5 分鐘彙總"
+            else:
+                table, resolution = "rollup_1h", "1 小時彙總"
+            time_col = "bucket"
+            gauge_select = ", ".join(
+                f"MIN({g}_min), CAST(SUM({g}_sum) AS REAL) / SUM(n), MAX({g}_max)"
+                for g in GAUGES
+            )
+            count_select = "SUM(n), SUM(online_sum)"
+            traffic_select = "SUM(in_delta), SUM(out_delta), SUM(elapsed)"
+        
+        row = self._conn.execute(
+            f"SELECT {count_select}, {gauge_select}, {traffic_select} "
+            f"FROM {table} WHERE node = ? AND {time_col} >= ?",
+            (node, since)
+        ).fetchone()
+        
+        samples = row[0] or 0
+        if not samples:
+            return None
+        
+        stats = {
+            "node": node,
+            "resolution": resolution,
+            "samples": samples,
+            "uptime": (row[1] or 0) / samples
+        }
+        for i, g in enumerate(GAUGES):
+            minimum, average, maximum = row[2 + i * 3:5 + i * 3]
+            stats[g] = {"min": minimum, "avg": average, "max": maximum}
+        
+        in_delta, out_delta, elapsed = (value or 0 for value in row[-3:])
+        stats["traffic_in"] = round(in_delta)
+        stats["traffic_out"] = round(out_delta)
+        stats["rate_in"] = in_delta / elapsed if elapsed else 0.0
+        stats["rate_out"] = out_delta / elapsed if elapsed else 0.0
+        stats["span"] = elapsed
+        return stats
+    
+    async def close(self):
+        """關閉資料庫連接"""
+        await self._db.close()
+
+# 全局實例
+metrics_history = MetricsHistory()
@@ -0,0 +1,189 @@
+"""離線分析 events.jsonl：按命令與上游端點統計延遲百分位、錯誤率和最活躍用戶
+
+用法:
+    python -m utils.log_analyzer data/logs/events.jsonl [data/logs/events.jsonl.1.gz ...] [--top 10]
+
+逐行流式讀取，延遲使用對數分桶直方圖、用戶排行使用 Space-Saving 算法，
+內存佔用與文件大小無關。
+"""
+import argparse
+import gzip
+import json
+import math
+import sys
+
+class LatencyHistogram:
+    """對數分桶的延遲直方圖，桶數固定，百分位相對誤差約 5%"""
+    MIN_VALUE = 0.0001  # 0.1 毫秒
+    GROWTH = 1.1
+    
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def add(self, value: float):
+        if value <= self.MIN_VALUE:
+            index = 0
+        else:
+            index = int(math.log(value / self.MIN_VALUE, self.GROWTH)) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+    
+    def percentile(self, p: float) -> float:
+        """返回第 p 百分位（取所在桶的幾何中點，不超過實際最大值）"""
+        if not self.count:
+            return 0.0
+        target = math.ceil(p / 100 * self.count)
+        cumulative = 0
+        for index in sorted(self.buckets):
+            cumulative += self.buckets[index]
+            if cumulative >= target:
+                return min(self.MIN_VALUE * self.GROWTH ** max(index - 0.5, 0), self.max)
+        return self.max
+
+class TopK:
+    """Space-Saving 近似頻率統計，最多保留 capacity 個鍵"""
+    
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counts = {}
+    
+    def add(self, key):
+        if key in self.counts:
+            self.counts[key] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = 1
+        else:
+            # 替換計數最小的鍵，繼承其計數（上界估計）
+            smallest = min(self.counts, key=self.counts.get)
+            self.counts[key] = self.counts.pop(smallest) + 1
+    
+    def most_common(self, n: int) -> list:
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+class GroupStats:
+    """單個命令或端點的統計"""
+    __slots__ = ("count", "errors", "cache_hits", "latency")
+    
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.latency = LatencyHistogram()
+
+class EventAnalyzer:
+    def __init__(self, top_capacity=100):
+        self.commands = {}
+        self.endpoints = {}
+        self.users = TopK(top_capacity)
+        self.lines = 0
+        self.malformed = 0
+    
+    def add(self, event: dict):
+        """累加一條事件"""
+        event_type = event.get("type")
+        if event_type == "command":
+            stats = self.commands.setdefault(event.get("command") or "unknown", GroupStats())
+            failed = event.get("status") != "ok"
+            if event.get("user") is not None:
+                self.users.add(event["user"])
+        elif event_type == "api":
+            stats = self.endpoints.setdefault(event.get("endpoint") or "unknown", GroupStats())
+            failed = not event.get("success", False)
+            if event.get("cache_hit"):
+                stats.cache_hits += 1
+        else:
+            return
+        
+        stats.count += 1
+        if failed:
+            stats.errors += 1
+        duration = event.get("duration")
+        if isinstance(duration, (int, float)):
+            stats.latency.add(duration)
+    
+    def feed(self, lines):
+        """逐行解析 JSONL"""
+        for line in lines:
+            self.lines += 1
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                self.malformed += 1
+                continue
+            if isinstance(event, dict):
+                self.add(event)
+            else:
+                self.malformed += 1
+
+def _open(path: str):
+    """打開日誌文件（支持輪替壓縮後的 .gz）"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+def _format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}ms"
+
+def _print_table(title: str, groups: dict, show_cache: bool, out):
+    print(f"\n== {title} ==", file=out)
+    if not groups:
+        print("（無數據）", file=out)
+        return
+    
+    header = f"{'名稱':<24}{'次數':>8}{'錯誤率':>9}"
+    if show_cache:
+        header += f"{'快取命中':>10}"
+    header += f"{'p50':>11}{'p95':>11}{'p99':>11}{'最大':>11}"
+    print(header, file=out)
+    
+    for name, stats in sorted(groups.items(), key=lambda item: item[1].count, reverse=True):
+        latency = stats.latency
+        row = f"{name:<24}{stats.count:>8}{stats.errors / stats.count * 100:>8.1f}%"
+        if show_cache:
+            row += f"{stats.cache_hits / stats.count * 100:>9.1f}%"
+        row += (
+            f"{_format_ms(latency.percentile(50)):>11}"
+            f"{_format_ms(latency.percentile(95)):>11}"
+            f"{_format_ms(latency.percentile(99)):>11}"
+            f"{_format_ms(latency.max):>11}"
+        )
+        print(row, file=out)
+
+def report(analyzer: EventAnalyzer, top: int = 10, out=sys.stdout):
+    """輸出統計報告"""
+    print(f"已處理 {analyzer.lines} 行（無法解析 {analyzer.malformed} 行）", file=out)
+    _print_table("命令", analyzer.commands, False, out)
+    _print_table("上游端點", analyzer.endpoints, True, out)
+    
+    print(f"\n== 最活躍用戶（前 {top}，近似值）==", file=out)
+    for user, count in analyzer.users.most_common(top):
+        print(f"{user:<24}{count:>8}", file=out)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="分析 TaiwanFRP Bot 的 events.jsonl 事件日誌")
+    parser.add_argument("files", nargs="+", help="events.jsonl 文件（可包含 .gz）")
+    parser.add_argument("--top", type=int, default=10, help="顯示最活躍用戶的數量")
+    args = parser.parse_args(argv)
+    
+    analyzer = EventAnalyzer(top_capacity=max(args.top * 10, 100))
+    for path in args.files:
+        try:
+            with _open(path) as f:
+                analyzer.feed(f)
+        except OSError as e:
+            print(f"❌ 無法讀取 {path}: {e}", file=sys.stderr)
+            return 1
+    
+    report(analyzer, top=args.top)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,106 @@
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import shutil
+import time
 from pathlib import Path
 from datetime import datetime
 
+# 文件輪替配置
+LOG_LEVEL = getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+LOG_ROTATE_HOURS = float(os.getenv("LOG_ROTATE_HOURS", "24"))
+LOG_COMPRESS = os.getenv("LOG_COMPRESS", "0").lower() in ("1", "true", "yes")
+
+# 是否輸出結構化 JSONL 事件日誌（events.jsonl，可用 python -m utils.log_analyzer 分析）
+LOG_JSON = os.getenv("LOG_JSON", "0").lower() in ("1", "true", "yes")
+
+# 上游響應採樣（調試用）：按比例寫入 payloads.log，每條最多 LOG_PAYLOAD_MAX_CHARS 個字符；0 為關閉
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "4096"))
+
+# 只寫文件、不輸出到控制台的日誌記錄器
+FILE_ONLY_LOGGERS = ("events", "payloads")
+
+# 輸出響應內容時隱去的字段
+SENSITIVE_KEYS = {"password", "token", "privilege_token", "auth_token", "secret"}
+
+def _gzip_rotator(source, dest):
+    """將輪替出的舊日誌壓縮為 .gz"""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+class SizedTimedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """同時按文件大小和時間間隔輪替的文件處理器，可選 gzip 壓縮"""
+    
+    def __init__(self, filename, max_bytes=0, backup_count=0, interval=0, compress=False):
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8',
+            delay=True
+        )
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+        if compress:
+            self.namer = lambda name: name + ".gz"
+            self.rotator = _gzip_rotator
+    
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+    
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+def _redact(value):
+    """遞歸隱去字典中的敏感字段"""
+    if isinstance(value, dict):
+        return {
+            k: "***" if str(k).lower() in SENSITIVE_KEYS else _redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(v) for v in value]
+    return value
+
+class LazyJSON:
+    """作為 %s 參數傳給日誌記錄器：只有記錄真正輸出時才序列化（隱去敏感字段並截斷）"""
+    __slots__ = ("value", "max_chars")
+    
+    def __init__(self, value, max_chars=LOG_PAYLOAD_MAX_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+    
+    def __str__(self):
+        text = json.dumps(_redact(self.value), ensure_ascii=False, default=str)
+        if self.max_chars and len(text) > self.max_chars:
+            return f"{text[:self.max_chars]}...（共 {len(text)} 字符，已截斷）"
+        return text
+
+class JSONLinesFormatter(logging.Formatter):
+    """將記錄上的 event 字典序列化為一行 JSON（在監聽線程中執行）"""
+    
+    def format(self, record):
+        event = {"ts": round(record.created, 3)}
+        event.update(getattr(record, 'event', None) or {"message": record.getMessage()})
+        return json.dumps(event, ensure_ascii=False, default=str)
+
 class BotLogger:
+    # 每個日誌目錄共用一條隊列和一個寫入線程（重複創建 BotLogger 不會重複添加處理器）
+    _pipelines = {}
+    
     def __init__(self, log_dir="data/logs"):
         self.log_dir = log_dir
         Path(log_dir).mkdir(parents=True, exist_ok=True)
@@ -14,6 +111,9 @@ class BotLogger:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         
+        # 各日誌記錄器只掛一個 QueueHandler，真正的文件/控制台寫入在背景線程完成
+        self.queue, self.listener = self._get_pipeline()
+        
         # 創建主日誌
         self.main_logger = self._setup_logger(
             'bot',
@@ -38,26 +138,88 @@ class BotLogger:
             os.path.join(log_dir, 'error.log'),
             level=logging.ERROR
         )
+        
+        # 創建結構化事件日誌（可選）
+        self.json_enabled = LOG_JSON
+        self.events_logger = None
+        if self.json_enabled:
+            self.events_logger = self._setup_logger(
+                'events',
+                os.path.join(log_dir, 'events.jsonl'),
+                level=logging.INFO,
+                formatter=JSONLinesFormatter()
+            )
+        
+        # 創建響應採樣日誌（可選）
+        self.payload_sample_rate = LOG_PAYLOAD_SAMPLE_RATE
+        self.payload_logger = None
+        if self.payload_sample_rate > 0:
+            self.payload_logger = self._setup_logger(
+                'payloads',
+                os.path.join(log_dir, 'payloads.log'),
+                level=logging.INFO
+            )
+    
+    def _get_pipeline(self):
+        """獲取（或創建並啟動）此日誌目錄的隊列與監聽線程"""
+        key = os.path.abspath(self.log_dir)
+        pipeline = self._pipelines.get(key)
+        if pipeline is None:
+            log_queue = queue.SimpleQueue()
+            
+            # 控制台處理器（所有記錄器共用）
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(self.formatter)
+            console_handler.addFilter(lambda record: record.name not in FILE_ONLY_LOGGERS)
+            
+            listener = logging.handlers.QueueListener(
+                log_queue, console_handler, respect_handler_level=True
+            )
+            listener.start()
+            atexit.register(listener.stop)
+            pipeline = self._pipelines[key] = (log_queue, listener)
+        return pipeline
     
-    def _setup_logger(self, name, log_file, level=logging.INFO):
+    def _setup_logger(self, name, log_file, level=None, formatter=None):
         """設置日誌記錄器"""
+        level = LOG_LEVEL if level is None else level
         logger = logging.getLogger(name)
         logger.setLevel(level)
+        # 不再傳給 root（discord.py 會在 root 上掛控制台處理器，否則每行會輸出兩次）
+        logger.propagate = False
         
-        # 文件處理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(level)
-        file_handler.setFormatter(self.formatter)
-        logger.addHandler(file_handler)
+        # 文件處理器（只接收本記錄器的記錄，在監聽線程中寫入）
+        handlers = self.listener.handlers
+        if not any(getattr(h, 'baseFilename', None) == os.path.abspath(log_file) for h in handlers):
+            file_handler = SizedTimedRotatingFileHandler(
+                log_file,
+                max_bytes=LOG_MAX_BYTES,
+                backup_count=LOG_BACKUP_COUNT,
+                interval=LOG_ROTATE_HOURS * 3600,
+                compress=LOG_COMPRESS
+            )
+            file_handler.setLevel(level)
+            file_handler.setFormatter(formatter or self.formatter)
+            file_handler.addFilter(logging.Filter(name))
+            self.listener.handlers = handlers + (file_handler,)
         
-        # 控制台處理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(level)
-        console_handler.setFormatter(self.formatter)
-        logger.addHandler(console_handler)
+        # 隊列處理器：調用方只做一次入隊，不在事件循環上碰磁盤或控制台
+        for handler in list(logger.handlers):
+            if getattr(handler, '_bot_logger_queue', False):
+                logger.removeHandler(handler)
+        queue_handler = logging.handlers.QueueHandler(self.queue)
+        queue_handler._bot_logger_queue = True
+        logger.addHandler(queue_handler)
         
         return logger
     
+    def close(self):
+        """停止監聽線程並寫出隊列中剩餘的記錄"""
+        key = os.path.abspath(self.log_dir)
+        if self._pipelines.pop(key, None) is not None:
+            atexit.unregister(self.listener.stop)
+            self.listener.stop()
+    
     def log_bind_attempt(self, discord_id, username, success, reason=None):
         """記錄帳號綁定嘗試"""
         if success:
@@ -69,10 +231,26 @@ class BotLogger:
             if reason:
                 self.error_logger.warning(f"綁定失敗: {reason}")
     
-    def log_api_call(self, method, endpoint, success, response_time=None, error=None):
+    def log_event(self, event_type, **fields):
+        """輸出一條結構化事件（未啟用 LOG_JSON 時直接返回）"""
+        if self.events_logger is None:
+            return
+        fields["type"] = event_type
+        self.events_logger.info(event_type, extra={"event": fields})
+    
+    def log_payload(self, endpoint, payload):
+        """按採樣率記錄一份上游響應（未啟用時只做一次判斷，不序列化）"""
+        if self.payload_logger is None or random.random() >= self.payload_sample_rate:
+            return
+        self.payload_logger.info("%s %s", endpoint, LazyJSON(payload))
+    
+    def log_api_call(self, method, endpoint, success, response_time=None, error=None,
+                     status=None, cache_hit=None, size=None):
         """記錄API調用"""
-        status = "✅" if success else "❌"
-        msg = f"{status} {method} {endpoint}"
+        status_emoji = "✅" if success else "❌"
+        msg = f"{status_emoji} {method} {endpoint}"
+        if status is not None:
+            msg += f" [{status}]"
         if response_time:
             msg += f" ({response_time:.2f}s)"
         if error:
@@ -80,6 +258,29 @@ class BotLogger:
             self.error_logger.error(msg)
         else:
             self.api_logger.info(msg)
+        
+        self.log_event(
+            "api",
+            method=method,
+            endpoint=endpoint,
+            success=success,
+            status=status,
+            duration=response_time,
+            cache_hit=cache_hit,
+            bytes=size,
+            error=str(error) if error else None
+        )
+    
+    def log_command_result(self, discord_id, command, status, duration=None, error=None):
+        """記錄命令執行結果與耗時（只輸出結構化事件）"""
+        self.log_event(
+            "command",
+            command=command,
+            user=discord_id,
+            status=status,
+            duration=duration,
+            error=str(error) if error else None
+        )
     
     def log_unbind(self, discord_id):
         """記錄解綁操作"""
@@ -0,0 +1,175 @@
+import asyncio
+import bisect
+import math
+import threading
+from utils.logger import logger
+
+# 默認延遲分桶（秒），覆蓋快取命中到上游超時
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Metric:
+    """帶標籤的指標基類，每組標籤值對應一個子序列"""
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} 需要標籤 {self.labelnames}，收到 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def labels_of(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+    
+    def items(self) -> list:
+        """返回 [(標籤值元組, 值)] 的快照"""
+        with self._lock:
+            return list(self._values.items())
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+    kind = "counter"
+    
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class Gauge(_Metric):
+    """當前值；按需計算的值由 MetricsRegistry 的回調在導出前設置"""
+    kind = "gauge"
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class HistogramValue:
+    """單組標籤的直方圖數據：各桶計數（非累積）、總和、次數"""
+    __slots__ = ("counts", "sum", "count")
+    
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+    
+    def cumulative(self) -> list:
+        """返回 Prometheus 格式的累積桶計數（最後一項為 +Inf）"""
+        result = []
+        total = 0
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+class Histogram(_Metric):
+    """固定分桶的直方圖，記錄延遲等分佈"""
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = HistogramValue(len(self.buckets))
+            data.counts[index] += 1
+            data.sum += value
+            data.count += 1
+
+class MetricsRegistry:
+    """進程內指標註冊表；同名指標只創建一次"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+    
+    def _register(self, cls, name: str, documentation: str, labelnames=(), **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指標 {name} 已以不同類型或標籤註冊")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+    
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def add_collector(self, collector):
+        """註冊在導出前調用的回調（可為協程函數），用於更新按需計算的計量值"""
+        self._collectors.append(collector)
+    
+    async def collect(self) -> list:
+        """運行所有回調後返回全部指標；單個回調失敗不影響其他指標"""
+        for collector in list(self._collectors):
+            try:
+                result = collector()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.log_error("指標回調失敗", f"{getattr(collector, '__name__', collector)}: {e}")
+        return list(self)
+    
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._metrics.values()))
+
+# 全局實例
+metrics = MetricsRegistry()
+
+# 斜線命令指標（由 BotCommandTree 和 on_app_command_completion 更新）
+command_requests = metrics.counter(
+    "bot_commands_total",
+    "Slash command invocations by command and result",
+    ("command", "status")
+)
+command_duration = metrics.histogram(
+    "bot_command_duration_seconds",
+    "Slash command handling time in seconds",
+    ("command",)
+)
+
+# 上游 API 調用指標（由 TaiwanFRPClient._request 更新）
+upstream_requests = metrics.counter(
+    "frp_upstream_requests_total",
+    "Upstream HTTP requests by endpoint and outcome",
+    ("endpoint", "status")
+)
+upstream_duration = metrics.histogram(
+    "frp_upstream_request_duration_seconds",
+    "Upstream HTTP request duration in seconds",
+    ("endpoint",)
+)
+upstream_bytes = metrics.counter(
+    "frp_upstream_response_bytes_total",
+    "Bytes received from upstream",
+    ("endpoint",)
+)
+upstream_cache = metrics.counter(
+    "frp_upstream_cache_total",
+    "Response cache lookups by endpoint and result",
+    ("endpoint", "result")
+)
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import math
+import os
+import sys
+from aiohttp import web
+from utils.logger import logger
+from utils.metrics import metrics, MetricsRegistry
+
+# 未設置 METRICS_PORT 時不啟動
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _format_value(value) -> str:
+    if value is None:
+        return "NaN"
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+def render(metric_list) -> str:
+    """按 Prometheus 文本格式（0.0.4）輸出指標"""
+    lines = []
+    for metric in metric_list:
+        lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in metric.items():
+            labels = metric.labels_of(key)
+            if metric.kind == "histogram":
+                for bound, count in zip(metric.buckets, value.cumulative()):
+                    bucket_labels = dict(labels, le=_format_value(bound))
+                    lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value.sum)}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {value.count}")
+            else:
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """內嵌的 aiohttp 服務，提供 /metrics 供 Prometheus 抓取"""
+    
+    def __init__(self, registry: MetricsRegistry = metrics, host=METRICS_HOST, port=METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner = None
+    
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        body = render(await self.registry.collect())
+        return web.Response(body=body.encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+    
+    async def start(self):
+        """啟動 HTTP 服務"""
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.main_logger.info(f"📈 指標服務已啟動: http://{self.host}:{self.port}/metrics")
+    
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+async def _serve(host: str, port: int):
+    # 導入機器人使用的模組，使其指標和按需計算的回調都已註冊
+    from utils.collectors import register_collector
+    from utils.encryption import pwd_manager
+    from utils.watchdog import watchdog
+    
+    register_collector()
+    watchdog.start()
+    server = MetricsServer(host=host, port=port)
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        watchdog.stop()
+        await pwd_manager.close()
+
+def main(argv=None) -> int:
+    """不登入 Discord、單獨啟動 /metrics 服務（包含機器人的全部指標），用於本地檢查輸出格式
+    
+    用法: python -m utils.metrics_server [--host 127.0.0.1] [--port 9100]
+    """
+    parser = argparse.ArgumentParser(description="單獨啟動 Prometheus /metrics 服務")
+    parser.add_argument("--host", default=METRICS_HOST)
+    parser.add_argument("--port", type=int, default=METRICS_PORT or 9100)
+    args = parser.parse_args(argv)
+    
+    try:
+        asyncio.run(_serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+# 有效端口範圍；超出範圍或無法解析的條目會被忽略
+MIN_PORT = 0
+MAX_PORT = 65535
+
+class PortRangeSet:
+    """不可變的端口集合，以排序的連續區間保存
+    
+    起止端口分別保存在兩個 array('H') 中（每個區間 4 字節），連續的端口不論多少都只佔一個區間：
+    - port in ports：二分查找，O(log 區間數)
+    - len(ports)：構造時計算，O(1)
+    - str(ports)：渲染為 "10000-10099, 20000"
+    """
+    __slots__ = ("_starts", "_ends", "_count")
+    
+    def __init__(self, ports=()):
+        """ports 可以是端口號、數字字符串或 "起-止" 字符串，順序與重複不影響結果
+        
+        無法解析或超出 0–65535 的條目會被忽略，不影響其餘端口。
+        """
+        try:
+            values = set(map(int, ports))
+        except (TypeError, ValueError):
+            values = set()
+            for port in ports:
+                try:
+                    if isinstance(port, str) and "-" in port:
+                        start, end = port.split("-", 1)
+                        values.update(range(max(int(start), MIN_PORT), min(int(end), MAX_PORT) + 1))
+                    else:
+                        values.add(int(port))
+                except (TypeError, ValueError):
+                    continue
+        ports = sorted(values)
+        # 已排序，兩次二分即可去掉範圍外的端口
+        self._build(ports[bisect_left(ports, MIN_PORT):bisect_right(ports, MAX_PORT)])
+    
+    def _build(self, ports: list):
+        """把已排序、無重複的端口切分為連續區間"""
+        # 相鄰端口不連續的位置即區間邊界
+        breaks = [i for i, (prev, port) in enumerate(zip(ports, ports[1:]), 1) if port != prev + 1]
+        if ports:
+            self._starts = array("H", [ports[0]] + [ports[i] for i in breaks])
+            self._ends = array("H", [ports[i - 1] for i in breaks] + [ports[-1]])
+        else:
+            self._starts = array("H")
+            self._ends = array("H")
+        self._count = len(ports)
+    
+    def __contains__(self, port) -> bool:
+        index = bisect_right(self._starts, port) - 1
+        return index >= 0 and port <= self._ends[index]
+    
+    def __len__(self):
+        return self._count
+    
+    def __bool__(self):
+        return self._count > 0
+    
+    def __iter__(self):
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+    
+    def __eq__(self, other):
+        if not isinstance(other, PortRangeSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+    
+    def ranges(self):
+        """按順序返回 (起, 止) 區間"""
+        return zip(self._starts, self._ends)
+    
+    def format(self, max_ranges: int = None, max_chars: int = None, sep: str = ", ") -> str:
+        """渲染區間列表；超出 max_ranges 個區間或 max_chars 個字符時以「等 N 個端口」結尾
+        
+        只遍歷實際輸出的區間，端口再多渲染成本也不變。
+        """
+        parts = []
+        length = 0
+        shown = 0
+        for index, (start, end) in enumerate(self.ranges()):
+            part = str(start) if start == end else f"{start}-{end}"
+            # 預留「, 等 65535 個端口」的長度
+            if (max_ranges is not None and index >= max_ranges) or \
+                    (max_chars is not None and length + len(part) + len(sep) + 16 > max_chars):
+                rest = f"等 {self._count - shown} 個端口"
+                return sep.join(parts + [rest])
+            parts.append(part)
+            length += len(part) + len(sep)
+            shown += end - start + 1
+        return sep.join(parts)
+    
+    def __str__(self):
+        return self.format()
+    
+    def __repr__(self):
+        return f"PortRangeSet({self.format(max_ranges=8)!r})"
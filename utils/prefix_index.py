@@ -0,0 +1,61 @@
+from bisect import bisect_left
+from utils.cache import TTLCache
+
+class PrefixIndex:
+    """不區分大小寫的名稱索引：排序列表 + 二分查找前綴，不足時補充包含匹配"""
+    __slots__ = ("keys", "names", "source_hash")
+    
+    def __init__(self, names, source_hash=None):
+        pairs = sorted({(name.casefold(), name) for name in names})
+        self.keys = [key for key, _ in pairs]
+        self.names = [name for _, name in pairs]
+        self.source_hash = source_hash
+    
+    def search(self, text: str, limit: int = 25) -> list:
+        """返回以 text 開頭的名稱（按字母序），數量不足時再加入包含 text 的名稱"""
+        prefix = text.casefold()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+        result = self.names[start:min(end, start + limit)]
+        
+        if prefix and len(result) < limit:
+            for i, key in enumerate(self.keys):
+                if start <= i < end or prefix not in key:
+                    continue
+                result.append(self.names[i])
+                if len(result) >= limit:
+                    break
+        return result
+    
+    def __len__(self):
+        return len(self.names)
+
+class UserPrefixIndex:
+    """按 Discord 用戶保存的名稱索引；用戶數有上限，閒置超過 idle_ttl 秒的索引會被淘汰"""
+    
+    def __init__(self, maxsize=1024, idle_ttl=1800.0):
+        # discord_id -> (帳號, PrefixIndex)
+        self._indexes = TTLCache(maxsize=maxsize, ttl=idle_ttl, name="tunnel_index")
+    
+    def update(self, discord_id: int, owner: str, names, source_hash=None) -> PrefixIndex:
+        """寫入用戶的名稱列表；來源哈希未變時沿用原索引"""
+        entry = self._indexes.get(discord_id)
+        if entry is not None and entry[0] == owner and source_hash is not None \
+                and entry[1].source_hash == source_hash:
+            index = entry[1]
+        else:
+            index = PrefixIndex(names, source_hash)
+        self._indexes.set(discord_id, (owner, index))
+        return index
+    
+    def search(self, discord_id: int, owner: str, text: str, limit: int = 25) -> list:
+        """查詢用戶的索引；沒有索引（或屬於其他帳號）時返回 None"""
+        entry = self._indexes.get(discord_id)
+        if entry is None or entry[0] != owner:
+            return None
+        # 每次使用都重置閒置計時
+        self._indexes.set(discord_id, entry)
+        return entry[1].search(text, limit)
+    
+    def __len__(self):
+        return len(self._indexes)
@@ -0,0 +1,110 @@
+import os
+import time
+from collections import OrderedDict
+import discord
+from discord import app_commands
+from utils.metrics import metrics
+
+def _parse_rate(value: str) -> tuple:
+    """解析 "次數/秒數" 格式，例如 "20/60" 表示每 60 秒 20 次；次數為 0 表示不限制"""
+    count, _, seconds = value.partition("/")
+    return int(count), float(seconds or 1)
+
+# 每個用戶所有命令的總預算、每個用戶單個命令的預算、全體用戶共享的上游請求預算（由 TaiwanFRPClient 按實際請求扣除）
+RATE_LIMIT_USER = _parse_rate(os.getenv("RATE_LIMIT_USER", "20/60"))
+RATE_LIMIT_COMMAND = _parse_rate(os.getenv("RATE_LIMIT_COMMAND", "5/30"))
+RATE_LIMIT_UPSTREAM = _parse_rate(os.getenv("RATE_LIMIT_UPSTREAM", "30/10"))
+
+# 每個限流器最多保存的令牌桶數量
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+rate_limit_rejections = metrics.counter(
+    "bot_rate_limit_rejections_total",
+    "Slash commands rejected by a rate limit before reaching upstream",
+    ("command", "scope")
+)
+
+class RateLimiter:
+    """按 key 分桶的令牌桶限流器
+    
+    每個桶只保存（剩餘令牌, 更新時間），讀取時按經過的時間補充令牌，操作均為 O(1)。
+    桶數量超過 maxsize 時淘汰最久未使用的桶；被淘汰的桶下次使用時視為滿桶，
+    只會讓長時間不活躍的用戶略微寬鬆，不影響正在頻繁調用的用戶。
+    """
+    
+    def __init__(self, rate: int, per: float, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.per = per
+        self.maxsize = maxsize
+        self._refill = rate / per if per > 0 else 0.0
+        self._buckets = OrderedDict()  # key -> [剩餘令牌, 更新時間]
+    
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+    
+    def _bucket(self, key, now: float) -> list:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(self.rate), now]
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(self.rate), bucket[0] + (now - bucket[1]) * self._refill)
+            bucket[1] = now
+        return bucket
+    
+    def retry_after(self, key, cost: float = 1.0) -> float:
+        """令牌足夠時返回 0，否則返回需要等待的秒數（不扣除令牌）"""
+        if not self.enabled:
+            return 0.0
+        # 代價超過桶容量時按滿桶計算，否則永遠無法通過
+        cost = min(cost, self.rate)
+        tokens = self._bucket(key, time.monotonic())[0]
+        if tokens >= cost:
+            return 0.0
+        if not self._refill:
+            return self.per
+        return (cost - tokens) / self._refill
+    
+    def consume(self, key, cost: float = 1.0):
+        """扣除令牌（應先用 retry_after 確認足夠）"""
+        if self.enabled:
+            bucket = self._bucket(key, time.monotonic())
+            bucket[0] = max(0.0, bucket[0] - min(cost, self.rate))
+    
+    def __len__(self):
+        return len(self._buckets)
+
+# 全局實例
+user_limiter = RateLimiter(*RATE_LIMIT_USER)
+command_limiter = RateLimiter(*RATE_LIMIT_COMMAND)
+upstream_limiter = RateLimiter(*RATE_LIMIT_UPSTREAM, maxsize=1)
+
+def rate_limit():
+    """斜線命令限流檢查：每個用戶的總預算與單個命令的預算
+    
+    兩個預算都足夠時才同時扣除，任一不足則拋出 CommandOnCooldown，
+    由全局錯誤處理回覆冷卻提示，不會發出任何上游請求。
+    全局上游預算不在這裡扣除，而是由 TaiwanFRPClient 在每次實際發出請求時扣除。
+    """
+    async def predicate(interaction: discord.Interaction) -> bool:
+        command_name = interaction.command.name if interaction.command else "unknown"
+        checks = (
+            ("user", user_limiter, interaction.user.id),
+            ("command", command_limiter, (interaction.user.id, command_name))
+        )
+        
+        for scope, limiter, key in checks:
+            retry_after = limiter.retry_after(key)
+            if retry_after > 0:
+                rate_limit_rejections.inc(command=command_name, scope=scope)
+                raise app_commands.CommandOnCooldown(
+                    app_commands.Cooldown(limiter.rate, limiter.per), retry_after
+                )
+        
+        for _, limiter, key in checks:
+            limiter.consume(key)
+        return True
+    return app_commands.check(predicate)
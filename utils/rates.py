@@ -0,0 +1,109 @@
+from utils.metrics import metrics
+
+counter_resets = metrics.counter(
+    "frp_node_counter_resets_total",
+    "Traffic counter resets seen per node (usually a frps restart)",
+    ("node",)
+)
+
+def counter_delta(current: int, previous: int) -> int:
+    """累計計數器的增量；計數器變小視為節點重啟後從零開始"""
+    if previous is None:
+        return 0
+    if current < previous:
+        return current
+    return current - previous
+
+class NodeRate:
+    """單個節點在兩次採樣之間的速率"""
+    __slots__ = ("node", "in_bps", "out_bps", "in_delta", "out_delta",
+                 "conn_delta", "client_delta", "interval", "reset")
+    
+    def __init__(self, node, in_delta=0, out_delta=0, conn_delta=0,
+                 client_delta=0, interval=0.0, reset=False):
+        self.node = node
+        self.in_delta = in_delta
+        self.out_delta = out_delta
+        self.conn_delta = conn_delta
+        self.client_delta = client_delta
+        self.interval = interval
+        self.reset = reset
+        # 字節/秒
+        self.in_bps = in_delta / interval if interval > 0 else 0.0
+        self.out_bps = out_delta / interval if interval > 0 else 0.0
+
+class RateEngine:
+    """根據累計流量計數器增量計算各節點吞吐量，每次更新只處理當前節點"""
+    
+    def __init__(self):
+        # node -> (採樣時間, traffic_in, traffic_out, cur_conns, client_counts)
+        self._previous = {}
+        self._last_payload = None
+        self.rates = {}
+    
+    def update(self, node: str, ts: float, traffic_in: int, traffic_out: int,
+               cur_conns: int = 0, client_counts: int = 0) -> NodeRate:
+        """加入一個樣本，返回與上一個樣本之間的速率（首個樣本返回 None）"""
+        previous = self._previous.get(node)
+        self._previous[node] = (ts, traffic_in, traffic_out, cur_conns, client_counts)
+        if previous is None:
+            return None
+        
+        prev_ts, prev_in, prev_out, prev_conns, prev_clients = previous
+        interval = ts - prev_ts
+        if interval <= 0:
+            return None
+        
+        reset = traffic_in < prev_in or traffic_out < prev_out
+        if reset:
+            counter_resets.inc(node=node)
+        
+        return NodeRate(
+            node,
+            in_delta=counter_delta(traffic_in, prev_in),
+            out_delta=counter_delta(traffic_out, prev_out),
+            conn_delta=cur_conns - prev_conns,
+            client_delta=client_counts - prev_clients,
+            interval=interval,
+            reset=reset
+        )
+    
+    def update_snapshot(self, monitor_data: dict, ts: float) -> dict:
+        """用一份監控響應更新所有節點，返回 {節點: NodeRate}；同一份響應不重複計算"""
+        result = monitor_data.get('result') if monitor_data else None
+        if not result or monitor_data is self._last_payload:
+            return self.rates
+        self._last_payload = monitor_data
+        
+        rates = {}
+        for node, data_list in result.items():
+            if not data_list:
+                continue
+            data = data_list[0]
+            rate = self.update(
+                node, ts,
+                data.get('total_traffic_in', 0),
+                data.get('total_traffic_out', 0),
+                data.get('cur_conns', 0),
+                data.get('client_counts', 0)
+            )
+            if rate is not None:
+                rates[node] = rate
+        
+        # 下線並從響應中消失的節點不再保留舊樣本
+        for node in self._previous.keys() - result.keys():
+            del self._previous[node]
+        
+        self.rates = rates
+        return rates
+    
+    @staticmethod
+    def aggregate(rates: dict) -> tuple:
+        """返回所有節點的 (入站字節/秒, 出站字節/秒)"""
+        return (
+            sum(rate.in_bps for rate in rates.values()),
+            sum(rate.out_bps for rate in rates.values())
+        )
+
+# 全局實例
+rate_engine = RateEngine()
@@ -0,0 +1,161 @@
+"""Embed 分頁渲染
+
+paginate() 按 Discord 的字段數與總長度限制把字段分成多頁；RenderCache 按數據源對象
+（監控快照、節點列表、隧道清單）快取渲染結果，同一份數據在 TTL 內只渲染一次，
+所有查看的用戶共用；PageView 提供翻頁按鈕。
+"""
+import os
+import discord
+from utils.cache import TTLCache
+
+# Discord embed 長度限制
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_CHARS = 6000
+EMBED_MAX_TITLE = 256
+EMBED_MAX_DESCRIPTION = 4096
+EMBED_MAX_FIELD_NAME = 256
+EMBED_MAX_FIELD_VALUE = 1024
+EMBED_MAX_FOOTER = 2048
+
+# 頁腳中為「· 第 i/n 頁」預留的長度
+_PAGE_LABEL_RESERVE = 24
+
+# 渲染結果的保留時間與翻頁按鈕的有效期（秒）
+RENDER_TTL = float(os.getenv("RENDER_TTL", "60"))
+PAGE_VIEW_TIMEOUT = float(os.getenv("PAGE_VIEW_TIMEOUT", "300"))
+
+def truncate(text, limit: int) -> str:
+    """超出長度時截斷並以 … 結尾"""
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def paginate(title: str, fields: list, description: str = None, color=None,
+             footer: str = None, max_fields: int = EMBED_MAX_FIELDS) -> list:
+    """把 (名稱, 值, inline) 字段按順序裝入多個 embed
+    
+    每頁沿用標題、描述和顏色；超長的字段名與值會被截斷；有多頁時在頁腳附加頁碼。
+    """
+    title = truncate(title, EMBED_MAX_TITLE)
+    description = truncate(description, EMBED_MAX_DESCRIPTION) if description else None
+    footer = truncate(footer, EMBED_MAX_FOOTER - _PAGE_LABEL_RESERVE) if footer else ""
+    base_size = len(title) + len(description or "") + len(footer) + _PAGE_LABEL_RESERVE
+    
+    pages = []
+    current = []
+    size = base_size
+    for name, value, inline in fields:
+        name = truncate(name or "\u200b", EMBED_MAX_FIELD_NAME)
+        value = truncate(value or "\u200b", EMBED_MAX_FIELD_VALUE)
+        field_size = len(name) + len(value)
+        if current and (len(current) >= max_fields or size + field_size > EMBED_MAX_CHARS):
+            pages.append(current)
+            current = []
+            size = base_size
+        current.append((name, value, inline))
+        size += field_size
+    pages.append(current)
+    
+    embeds = []
+    for index, page_fields in enumerate(pages, 1):
+        embed = discord.Embed(title=title, description=description, color=color)
+        for name, value, inline in page_fields:
+            embed.add_field(name=name, value=value, inline=inline)
+        if len(pages) > 1:
+            label = f"第 {index}/{len(pages)} 頁"
+            embed.set_footer(text=f"{footer} · {label}" if footer else label)
+        elif footer:
+            embed.set_footer(text=footer)
+        embeds.append(embed)
+    return embeds
+
+class RenderCache:
+    """按 key 保存 (數據源, 頁面)；數據源是同一個對象時直接返回上次的頁面"""
+    
+    def __init__(self, maxsize: int = 256, ttl: float = RENDER_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl, name="render")
+        self.hits = 0
+        self.misses = 0
+    
+    def lookup(self, key, source) -> list:
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] is source:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+    
+    def store(self, key, source, pages: list) -> list:
+        self._cache.set(key, (source, pages))
+        return pages
+    
+    def render(self, key, source, build) -> list:
+        """返回快取的頁面，沒有時調用 build() 渲染並保存"""
+        pages = self.lookup(key, source)
+        if pages is None:
+            pages = self.store(key, source, build())
+        return pages
+    
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+# 全局實例
+render_cache = RenderCache()
+
+class PageView(discord.ui.View):
+    """上一頁 / 下一頁按鈕；頁面列表由 RenderCache 共享，每條消息只保存自己的頁碼"""
+    
+    def __init__(self, pages: list, owner_id: int = None, timeout: float = PAGE_VIEW_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.owner_id = owner_id
+        self.page = 0
+        self.message = None
+        self._sync()
+    
+    def _sync(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+        self.page_label.label = f"{self.page + 1}/{len(self.pages)}"
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """公開消息只允許執行命令的用戶翻頁"""
+        if self.owner_id is None or interaction.user.id == self.owner_id:
+            return True
+        await interaction.response.send_message("❌ 請自行執行命令查看其他頁", ephemeral=True)
+        return False
+    
+    async def _show(self, interaction: discord.Interaction):
+        self._sync()
+        await interaction.response.edit_message(embed=self.pages[self.page], view=self)
+    
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+    
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_label(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+    
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(len(self.pages) - 1, self.page + 1)
+        await self._show(interaction)
+    
+    async def on_timeout(self):
+        """過期後移除按鈕"""
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass
+
+async def send_pages(interaction: discord.Interaction, pages: list, ephemeral: bool = False):
+    """以 followup 發送頁面；只有一頁時不附加按鈕"""
+    if len(pages) == 1:
+        await interaction.followup.send(embed=pages[0], ephemeral=ephemeral)
+        return
+    view = PageView(pages, owner_id=interaction.user.id)
+    view.message = await interaction.followup.send(embed=pages[0], view=view, ephemeral=ephemeral, wait=True)
@@ -0,0 +1,48 @@
+import asyncio
+from datetime import datetime
+
+class MonitorSnapshot:
+    """某一時刻的節點列表與監控數據，生成後不再修改
+    
+    監控數據和狀態頁抓取失敗時沿用上一個快照的數據，monitor_at / services_at 記錄其實際抓取時間。
+    """
+    __slots__ = ("nodes", "monitor", "rates", "services", "updated_at", "monitor_at", "services_at")
+    
+    def __init__(self, nodes=None, monitor=None, rates=None, services=None,
+                 monitor_at=None, services_at=None):
+        self.nodes = nodes or []
+        self.monitor = monitor or {}
+        self.rates = rates or {}  # 節點 -> NodeRate
+        self.services = services or {}  # Uptime Kuma 狀態頁解析結果
+        self.updated_at = datetime.now()
+        self.monitor_at = monitor_at or self.updated_at
+        self.services_at = services_at or self.updated_at
+
+class SnapshotStore:
+    """保存最新的監控快照，供所有監控命令共享"""
+    
+    def __init__(self):
+        self.current = None
+        self._lock = None
+    
+    async def refresh(self, fetch):
+        """調用 fetch() 生成新快照；並發調用只會觸發一次抓取"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        previous = self.current
+        async with self._lock:
+            # 等鎖期間其他調用已經刷新過，直接使用其結果
+            if self.current is not previous:
+                return self.current
+            self.current = await fetch()
+            return self.current
+    
+    async def get(self, fetch):
+        """返回當前快照，尚未有快照時立即抓取一次"""
+        if self.current is not None:
+            return self.current
+        return await self.refresh(fetch)
+
+# 全局實例
+snapshot_store = SnapshotStore()
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from utils.logger import logger
+
+class SQLiteWorker:
+    """一個 sqlite3 連接及其專用線程（WAL 模式）
+    
+    sqlite3 連接只能在創建它的線程使用，因此所有操作都經由 run() 提交到同一個單線程執行器。
+    """
+    
+    def __init__(self, db_file: str, thread_name: str, setup=None):
+        self.db_file = db_file
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=thread_name)
+        self.conn = None
+        self._executor.submit(self._open, setup).result()
+    
+    def _open(self, setup):
+        """打開資料庫，再由 setup(conn) 建立表格"""
+        self.conn = sqlite3.connect(self.db_file)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if setup is not None:
+            setup(self.conn)
+    
+    async def run(self, func, *args):
+        """在專用線程上執行資料庫操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    async def close(self):
+        """關閉連接並結束工作線程"""
+        await self.run(self.conn.close)
+        self._executor.shutdown(wait=True)
+
+class CredentialBackend(ABC):
+    """認證信息存儲後端接口，所有讀寫都不得阻塞事件循環"""
+    
+    @abstractmethod
+    async def get(self, discord_id: str) -> dict:
+        """按 Discord ID 讀取 {"username", "password"}（密碼為密文），不存在時返回 None"""
+    
+    @abstractmethod
+    async def set(self, discord_id: str, user_data: dict):
+        """寫入或覆蓋一條記錄"""
+    
+    @abstractmethod
+    async def delete(self, discord_id: str) -> bool:
+        """刪除一條記錄，返回是否存在"""
+    
+    @abstractmethod
+    async def count(self) -> int:
+        """已綁定的用戶數量"""
+    
+    @abstractmethod
+    async def close(self):
+        """寫回未完成的變更並釋放資源"""
+
+def load_json_database(db_file: str, journal_file: str) -> tuple:
+    """讀取 JSON 快照並重放日誌，返回 (資料, 重放條數)"""
+    with open(db_file, "r") as f:
+        data = json.load(f)
+    
+    if not os.path.exists(journal_file):
+        return data, 0
+    
+    replayed = 0
+    with open(journal_file, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # 最後一行可能因中途斷電而不完整，忽略即可
+                logger.main_logger.warning(f"⚠️  忽略損壞的日誌記錄: {journal_file}")
+                continue
+            
+            if entry.get("op") == "set":
+                data[entry["id"]] = entry["data"]
+            elif entry.get("op") == "del":
+                data.pop(entry["id"], None)
+            replayed += 1
+    
+    return data, replayed
+
+class JSONCredentialStore(CredentialBackend):
+    """JSON 文件後端：內存字典 + 追加式日誌，適合小型部署"""
+    
+    # 日誌累積超過此條數時，將整個資料庫壓縮回快照文件
+    JOURNAL_COMPACT_THRESHOLD = 500
+    
+    def __init__(self, db_file="data/users.json"):
+        self.db_file = db_file
+        self.journal_file = f"{db_file}.journal"
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        
+        # 初始化資料庫
+        if not os.path.exists(self.db_file):
+            self._atomic_write(self.db_file, {})
+        
+        # 單線程執行器，保證日誌寫入與壓縮按提交順序執行
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="json-creds")
+        
+        # 內存中的用戶資料（寫穿式：先更新內存，再於背景線程持久化）
+        self._users, replayed = load_json_database(self.db_file, self.journal_file)
+        self._journal_entries = 0
+        
+        # 啟動時順便壓縮，讓日誌從空白開始
+        if replayed:
+            self._compact(dict(self._users))
+    
+    @staticmethod
+    def _atomic_write(path: str, data: dict):
+        """原子寫入 JSON 文件（寫入臨時文件後替換）"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def _append_journal(self, entry: dict):
+        """追加一條日誌記錄（於背景線程執行）"""
+        with open(self.journal_file, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def _compact(self, snapshot: dict):
+        """將快照寫回資料庫並清空日誌（於背景線程執行）"""
+        self._atomic_write(self.db_file, snapshot)
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+    
+    async def _persist(self, entry: dict):
+        """將一條變更交給背景線程寫入，必要時觸發壓縮"""
+        loop = asyncio.get_running_loop()
+        write = loop.run_in_executor(self._writer, self._append_journal, entry)
+        self._journal_entries += 1
+        
+        compaction = None
+        if self._journal_entries >= self.JOURNAL_COMPACT_THRESHOLD:
+            # 在當前線程複製快照，確保其包含所有已提交的變更
+            compaction = loop.run_in_executor(self._writer, self._compact, dict(self._users))
+            self._journal_entries = 0
+        
+        await write
+        if compaction is not None:
+            await compaction
+    
+    async def get(self, discord_id: str) -> dict:
+        return self._users.get(discord_id)
+    
+    async def set(self, discord_id: str, user_data: dict):
+        self._users[discord_id] = user_data
+        await self._persist({"op": "set", "id": discord_id, "data": user_data})
+    
+    async def delete(self, discord_id: str) -> bool:
+        if discord_id not in self._users:
+            return False
+        del self._users[discord_id]
+        await self._persist({"op": "del", "id": discord_id})
+        return True
+    
+    async def count(self) -> int:
+        return len(self._users)
+    
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self._compact, dict(self._users))
+        self._journal_entries = 0
+        self._writer.shutdown(wait=True)
+
+class SQLiteCredentialStore(CredentialBackend):
+    """SQLite 後端（WAL 模式），所有操作在專用線程上執行，適合大量用戶"""
+    
+    def __init__(self, db_file="data/users.db", legacy_file="data/users.json"):
+        self.db_file = db_file
+        self.legacy_file = legacy_file
+        self._conn = None
+        self._db = SQLiteWorker(db_file, "sqlite-creds", self._open)
+    
+    def _open(self, conn: sqlite3.Connection):
+        """建立表格並執行一次性遷移（在資料庫線程上執行）"""
+        self._conn = conn
+        # discord_id 為 INTEGER PRIMARY KEY（rowid 別名），查詢直接走主鍵索引
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS credentials ("
+            "discord_id INTEGER PRIMARY KEY, "
+            "username TEXT NOT NULL, "
+            "password TEXT NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._migrate_from_json()
+    
+    def _migrate_from_json(self):
+        """若舊的 users.json 存在，將其導入並改名，只執行一次"""
+        if not os.path.exists(self.legacy_file):
+            return
+        
+        journal_file = f"{self.legacy_file}.journal"
+        data, _ = load_json_database(self.legacy_file, journal_file)
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO credentials (discord_id, username, password, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (int(discord_id), user_data["username"], user_data["password"], now)
+                    for discord_id, user_data in data.items()
+                ]
+            )
+        
+        os.replace(self.legacy_file, f"{self.legacy_file}.migrated")
+        if os.path.exists(journal_file):
+            os.replace(journal_file, f"{journal_file}.migrated")
+        logger.main_logger.info(f"✅ 已將 {len(data)} 位用戶從 {self.legacy_file} 遷移到 {self.db_file}")
+    
+    def _get(self, discord_id: str) -> dict:
+        row = self._conn.execute(
+            "SELECT username, password FROM credentials WHERE discord_id = ?",
+            (int(discord_id),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"username": row[0], "password": row[1]}
+    
+    def _set(self, discord_id: str, user_data: dict):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO credentials (discord_id, username, password, updated_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(discord_id) DO UPDATE SET "
+                "username = excluded.username, password = excluded.password, "
+                "updated_at = excluded.updated_at",
+                (int(discord_id), user_data["username"], user_data["password"], time.time())
+            )
+    
+    def _delete(self, discord_id: str) -> bool:
+        with self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM credentials WHERE discord_id = ?",
+                (int(discord_id),)
+            )
+        return cursor.rowcount > 0
+    
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM credentials").fetchone()[0]
+    
+    async def get(self, discord_id: str) -> dict:
+        return await self._db.run(self._get, discord_id)
+    
+    async def set(self, discord_id: str, user_data: dict):
+        await self._db.run(self._set, discord_id, user_data)
+    
+    async def delete(self, discord_id: str) -> bool:
+        return await self._db.run(self._delete, discord_id)
+    
+    async def count(self) -> int:
+        return await self._db.run(self._count)
+    
+    async def close(self):
+        await self._db.close()
+
+def create_backend(kind: str = None) -> CredentialBackend:
+    """按 CREDENTIAL_BACKEND 環境變量（json / sqlite）創建存儲後端"""
+    kind = (kind or os.getenv("CREDENTIAL_BACKEND", "json")).lower()
+    if kind == "sqlite":
+        return SQLiteCredentialStore(
+            db_file=os.getenv("CREDENTIAL_DB", "data/users.db"),
+            legacy_file=os.getenv("CREDENTIAL_JSON", "data/users.json")
+        )
+    if kind == "json":
+        return JSONCredentialStore(db_file=os.getenv("CREDENTIAL_JSON", "data/users.json"))
+    raise ValueError(f"❌ 未知的認證存儲後端: {kind}")
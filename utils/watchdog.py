@@ -0,0 +1,178 @@
+import asyncio
+import collections
+import os
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from utils.logger import logger
+from utils.metrics import metrics
+
+# 事件循環心跳間隔與阻塞告警閾值（秒）
+WATCHDOG_INTERVAL = float(os.getenv("WATCHDOG_INTERVAL", "0.1"))
+WATCHDOG_THRESHOLD = float(os.getenv("WATCHDOG_THRESHOLD", "0.5"))
+
+# 採樣分析器：採樣間隔（秒）、默認時長（秒）和輸出目錄
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_SECONDS = int(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+
+loop_lag = metrics.gauge(
+    "bot_event_loop_lag_seconds",
+    "Delay between a scheduled wake-up and the event loop running it"
+)
+loop_stalls = metrics.counter(
+    "bot_event_loop_stalls_total",
+    "Times a single callback blocked the event loop longer than the threshold"
+)
+
+def _frame_label(frame) -> str:
+    """folded 格式中的單個棧幀：函數名 (文件:行號)"""
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    else:
+        filename = os.path.join(*Path(filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{frame.f_lineno})".replace(";", ":")
+
+class LoopWatchdog:
+    """持續測量事件循環延遲；循環被阻塞超過閾值時，從監視線程記錄循環線程當前的堆棧"""
+    
+    def __init__(self, interval=WATCHDOG_INTERVAL, threshold=WATCHDOG_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.loop_thread_id = None
+        self._last_beat = 0.0
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def start(self):
+        """在事件循環內調用：啟動心跳任務和監視線程"""
+        if self._task is not None:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.ensure_future(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+    
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            
+            lag = max(now - expected, 0.0)
+            loop_lag.set(lag)
+            if lag > self.threshold:
+                loop_stalls.inc()
+                logger.main_logger.warning(f"🐢 事件循環恢復，本次阻塞約 {lag:.2f}s")
+    
+    def _monitor(self):
+        """監視線程：心跳超時即說明有回調正在阻塞循環，只在每次阻塞開始時記錄一次堆棧"""
+        reported = False
+        while not self._stop.wait(self.interval):
+            blocked = time.monotonic() - self._last_beat - self.interval
+            if blocked <= self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            
+            reported = True
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "（無法獲取堆棧）\n"
+            logger.main_logger.warning(
+                f"⚠️ 事件循環已阻塞 {blocked:.2f}s（閾值 {self.threshold}s），當前堆棧:\n{stack.rstrip()}"
+            )
+    
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+class SamplingProfiler:
+    """定時採樣指定線程的調用棧，輸出 folded 格式（flamegraph.pl / speedscope 可直接讀取）"""
+    
+    def __init__(self, interval=PROFILE_INTERVAL, output_dir=PROFILE_DIR):
+        self.interval = interval
+        self.output_dir = output_dir
+        self.last_path = None
+        self._thread = None
+        self._stop = threading.Event()
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, thread_id: int, duration: float = None):
+        """開始採樣；指定 duration 時到時自動停止並寫出文件"""
+        if self.running:
+            raise RuntimeError("採樣已在進行中")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(thread_id, duration), name="profiler", daemon=True
+        )
+        self._thread.start()
+        logger.main_logger.info(f"🔬 開始採樣分析（間隔 {self.interval * 1000:.0f}ms）")
+    
+    def _run(self, thread_id: int, duration: float):
+        stacks = collections.Counter()
+        samples = 0
+        deadline = time.monotonic() + duration if duration else None
+        
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        
+        self.last_path = self._write(stacks)
+        logger.main_logger.info(f"🔬 採樣結束：{samples} 個樣本已寫入 {self.last_path}")
+    
+    def _write(self, stacks: collections.Counter) -> str:
+        Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+    
+    def wait(self) -> str:
+        """阻塞直到採樣結束，返回輸出文件路徑（在線程池中調用）"""
+        if self._thread is not None:
+            self._thread.join()
+        return self.last_path
+    
+    def stop(self) -> str:
+        """停止採樣並返回輸出文件路徑（在線程池中調用）"""
+        self._stop.set()
+        return self.wait()
+    
+    def toggle(self, thread_id: int):
+        """未運行時開始採樣，否則停止（用於 SIGUSR1）"""
+        if self.running:
+            self._stop.set()
+        else:
+            self.start(thread_id)
+
+# 全局實例
+watchdog = LoopWatchdog()
+profiler = SamplingProfiler()